@@ -0,0 +1,38 @@
+"""regex operator
+
+Revision ID: d41f8c2b6e90
+Revises: b7d3e9a1c4f2
+Create Date: 2026-10-18 17:05:12.664208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f8c2b6e90'
+down_revision: Union[str, None] = 'b7d3e9a1c4f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('config') as batch_op:
+        batch_op.alter_column(
+            'operator',
+            existing_type=sa.Enum('IN', 'NOTIN', 'EQ', 'NE', name='onlineoperatorenaum'),
+            type_=sa.Enum('IN', 'NOTIN', 'EQ', 'NE', 'REGEX', name='onlineoperatorenaum'),
+            existing_nullable=True
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('config') as batch_op:
+        batch_op.alter_column(
+            'operator',
+            existing_type=sa.Enum('IN', 'NOTIN', 'EQ', 'NE', 'REGEX', name='onlineoperatorenaum'),
+            type_=sa.Enum('IN', 'NOTIN', 'EQ', 'NE', name='onlineoperatorenaum'),
+            existing_nullable=True
+        )
@@ -4,9 +4,11 @@ including routers
 """
 from fastapi import APIRouter
 
-from .endpoints import server, service
+from .endpoints import health, metrics, server, service
 
 api_router = APIRouter()
 
 api_router.include_router(server.router, prefix="/server", tags=["Server"])
 api_router.include_router(service.router, prefix="/service", tags=["Service"])
+api_router.include_router(metrics.router, prefix="/metrics", tags=["Metrics"])
+api_router.include_router(health.router, prefix="/health", tags=["Health"])
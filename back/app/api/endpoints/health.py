@@ -0,0 +1,24 @@
+"""
+HEALTH API ENDPOINT
+"""
+from fastapi import APIRouter, Response, status
+
+from app.src import connection_manager
+
+router = APIRouter()
+
+
+@router.get("/ready", responses={
+            200: {"model": dict},
+            503: {"model": dict},
+        }
+    )
+async def get_readiness(response: Response):
+    """
+    readiness of service. ready once ssh warm-up of all servers is finished,
+    with warm-up progress and time to ready
+    """
+    warmup = dict(connection_manager.SSHManager().warmup)
+    if not warmup["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return warmup
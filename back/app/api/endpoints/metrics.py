@@ -0,0 +1,19 @@
+"""
+METRICS API ENDPOINT
+"""
+from fastapi import APIRouter
+
+from app.core import metrics
+
+router = APIRouter()
+
+
+@router.get("/", responses={
+            200: {"model": dict[str, int]},
+        }
+    )
+async def get_metrics():
+    """
+    get in process counters
+    """
+    return metrics.snapshot()
@@ -2,16 +2,19 @@
 SSH SERVER API ENDPOINT
 """
 
+import time
 from threading import Thread
+
 import sqlalchemy.exc
 from fastapi import (APIRouter, File, Form, HTTPException, Query, Request, Response,
                      UploadFile, WebSocket, WebSocketDisconnect, status)
 
 from app import crud
 from app.api.deps import SessionDep, savefile
-from app.models import ServerCreate, ServerDetail, ServerPublic, ServerUpdate
+from app.models import (ServerCreate, ServerDetail, ServerMetricPublic,
+                        ServerMetrics, ServerPublic, ServerUpdate)
 from app.schema import HTTPError
-from app.src import connection_manager
+from app.src import connection_manager, server_metrics
 
 router = APIRouter()
 
@@ -45,6 +48,47 @@ async def get_server_by_id(
     raise HTTPException(status_code=404, detail="Server not found")
 
 
+@router.get("/{id_server}/metrics", responses={
+            200: {"model": ServerMetrics},
+            400: {"model": HTTPError},
+            404: {"model": HTTPError},
+        }
+    )
+async def get_server_metrics(
+        session: SessionDep,
+        id_server: int,
+        start: float | None = Query(default=None, description="epoch seconds, default one hour before end"),
+        end: float | None = Query(default=None, description="epoch seconds, default now"),
+    ):
+    """
+    get load history of a server. resolution (0 for raw samples, 60 or 3600 seconds)
+    is picked from requested time range.
+    """
+    s = await crud.server.get_server_by_id(session=session, id_server=id_server)
+    if not s:
+        raise HTTPException(status_code=404, detail="Server not found")
+    now = time.time()
+    end = now if end is None else end
+    start = end - 3600 if start is None else start
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    resolution = server_metrics.pick_resolution(start=start, end=end, now=now)
+    metrics = await crud.server_metric.get_server_metrics(
+        session=session,
+        id_server=id_server,
+        resolution=resolution,
+        start=start,
+        end=end
+    )
+    return ServerMetrics(
+        id_server=id_server,
+        resolution=resolution,
+        start=start,
+        end=end,
+        data=[ServerMetricPublic.model_validate(m) for m in metrics]
+    )
+
+
 @router.get("/",responses={
             200: {"model": list[ServerPublic]},
         }
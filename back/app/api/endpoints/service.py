@@ -3,10 +3,10 @@ Service API ENDPOINT
 """
 
 import json
-from threading import Thread
 
 from fastapi import (APIRouter, HTTPException, Query, Response, WebSocket,
                      WebSocketDisconnect, status)
+from sqlmodel import Session
 
 from app import crud
 from app.api.deps import SessionDep
@@ -17,7 +17,8 @@ from app.models import (ConfigBaseJournal, ConfigBaseOnline, ConfigBaseSystemd,
 from app.models.config import (ConfigUpdate, ConfigUpdateJournal,
                                ConfigUpdateOnline, ConfigUpdateSystemd)
 from app.schema import HTTPError
-from app.src import callbacks, connection_manager
+from app.src import beat_cache, checker, connection_manager, predicates, task
+from app.src.beat_writer import BeatWriter
 
 logging = get_configed_logging()
 logger = logging.getLogger(__name__)
@@ -122,6 +123,10 @@ async def creata_service(
         server = session.get(Server, service.id_server)
         if not server:
             raise ValueError(f"invalid server id {service.id_server}")
+        predicates.validate_predicate(
+            operator=getattr(config, "operator", None),
+            desired=getattr(config, "desired_response", None)
+        )
         data = None
         if isinstance(config, ConfigBaseOnline):
             stype = ServiceTypeEnum.ONLINE
@@ -147,7 +152,13 @@ async def creata_service(
         resp = service_db.model_copy()
         await crud.config.create_config(session=session, conf=confcreate)
         if resp.id_service:
-            Thread(target=callbacks.beater_callback, args=(resp.id_service,), daemon=True, name="beater callback").start()
+            task.BeatScheduler().schedule(
+                id_service=resp.id_service,
+                service_type=resp.service_type,
+                id_server=resp.id_server,
+                interval=confcreate.interval,
+                phase_key=checker.online_phase_key(service_db)
+            )
         response.status_code = status.HTTP_201_CREATED
         return resp
     except Exception as e:
@@ -196,6 +207,10 @@ async def update_service(
         #         detail="Service type can not change."
         #     )
         confupdate = ConfigUpdate.model_validate(config)
+        predicates.validate_predicate(
+            operator=confupdate.operator or serv.config.operator,
+            desired=confupdate.desired_response or serv.config.desired_response
+        )
         conf_id = serv.config.id_config
         if conf_id:
             await crud.config.update_config(session=session, id_config=conf_id, conf=confupdate)
@@ -217,6 +232,13 @@ async def update_service(
                 status_code=response.status_code,
                 detail="Update Failed!"
             )
+        task.BeatScheduler().schedule(
+            id_service=id_service,
+            service_type=db_obj.service_type,
+            id_server=db_obj.id_server,
+            interval=serv.config.interval,
+            phase_key=checker.online_phase_key(db_obj)
+        )
         return db_obj
     except ValueError as e:
         response.status_code = status.HTTP_400_BAD_REQUEST
@@ -242,6 +264,9 @@ async def delete_service_by_id(
     """
     obj = await crud.service.delete_service_by_id(session=session, id_service=id_service)
     if obj:
+        task.BeatScheduler().unschedule(id_service=id_service)
+        beat_cache.BeatCache().remove(id_service=id_service)
+        BeatWriter().discard_cursor(id_service=id_service)
         response.status_code = status.HTTP_202_ACCEPTED
         return {"ok": True}
     response.status_code = status.HTTP_404_NOT_FOUND
@@ -249,25 +274,42 @@ async def delete_service_by_id(
 
 
 @router.websocket("/")
-async def get_service_beats(websocket: WebSocket):
+async def get_service_beats(session: SessionDep, websocket: WebSocket, seq: int | None = None):
     """
-    stream heartbeat status of all services
+    stream heartbeat status of all services.
+    a snapshot of the channel is sent first, then every new beat is pushed as a delta
+    tagged with a sequence number. a reconnecting client may pass its last sequence
+    number (`seq` query param or `{"seq": ...}` message) to receive only missed deltas.
     """
     ws_manager = connection_manager.ServiceConnectionManager()
-    await ws_manager.connect(websocket=websocket, channel=0)
+
+    async def sync(channel: int, seq: int | None):
+        # a short lived session per sync, so snapshots never come from a stale identity map
+        with Session(session.get_bind()) as sync_session:
+            messages = await task.live_board_sync(session=sync_session, channel=channel, seq=seq)
+        for m in messages:
+            await ws_manager.send_personal_message(
+                message=connection_manager.encode(m),
+                websocket=websocket
+            )
+
+    channel = 0
+    await ws_manager.connect(websocket=websocket, channel=channel)
     try:
+        await sync(channel=channel, seq=seq)
         while True:
             message = await websocket.receive_json()
+            if "seq" in message:
+                await sync(channel=channel, seq=int(message["seq"]))
+                continue
             if "id_server" in message:
-                await ws_manager.change_channel(
-                    websocket=websocket,
-                    channel= -1 * int(message["id_server"])
-                    )
+                channel = -1 * int(message["id_server"])
             elif "id_service" in message:
-                await ws_manager.change_channel(
-                    websocket=websocket,
-                    channel=int(message["id_service"])
-                    )
+                channel = int(message["id_service"])
+            else:
+                continue
+            await ws_manager.change_channel(websocket=websocket, channel=channel)
+            await sync(channel=channel, seq=None)
     except WebSocketDisconnect as e:
         logger.exception(e)
         ws_manager.disconnect(websocket)
@@ -0,0 +1,25 @@
+"""
+metrics module
+in process counters of notable events (evictions, overruns, ...)
+"""
+import threading
+from collections import Counter
+
+_lock = threading.Lock()
+_counters: Counter[str] = Counter()
+
+
+def incr(name: str, value: int = 1):
+    """
+    increase a counter
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def snapshot() -> dict[str, int]:
+    """
+    returns current value of all counters
+    """
+    with _lock:
+        return dict(_counters)
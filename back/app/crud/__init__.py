@@ -3,5 +3,7 @@ Crud
 """
 from app.crud import crud_beat as beat
 from app.crud import crud_server as server
+from app.crud import crud_server_metric as server_metric
 from app.crud import crud_service as service
 from app.crud import crud_config as config
+from app.crud import crud_journal_cursor as journal_cursor
@@ -1,6 +1,8 @@
 """
 CRUD for SSH Servers
 """
+from sqlalchemy import func, insert
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select
 
 from app.models import Beat, BeatCreate
@@ -15,3 +17,49 @@ async def create_beat(session: Session, beat_create: BeatCreate) -> Beat:
     session.commit()
     session.refresh(db_obj)
     return db_obj
+
+
+def create_beats(session: Session, beats: list[BeatCreate]) -> int:
+    """
+    create many beats with a single bulk insert in one transaction.
+    returns number of inserted beats
+    """
+    if not beats:
+        return 0
+    session.exec(insert(Beat), params=[b.model_dump() for b in beats]) # type: ignore
+    session.commit()
+    return len(beats)
+
+
+async def get_latest_beats(
+        session: Session,
+        limit: int,
+        id_services: list[int] | None = None
+    ) -> dict[int, list[Beat]]:
+    """
+    get latest `limit` beats of many services in one query.
+    returns beats of each service ordered by timestamp
+    """
+    row_number = func.row_number().over(
+        partition_by=Beat.id_service, # type: ignore
+        order_by=Beat.timestamp.desc() # type: ignore
+    ).label("row_number")
+    ranked = select(Beat, row_number)
+    if id_services is not None:
+        ranked = ranked.where(Beat.id_service.in_(id_services)) # type: ignore
+    ranked = ranked.subquery()
+    beat = aliased(Beat, ranked)
+    beats = session.exec(
+            select(
+                beat
+            ).where(
+                ranked.c.row_number <= limit
+            ).order_by(
+                ranked.c.id_service,
+                ranked.c.timestamp
+            )
+        ).all()
+    result: dict[int, list[Beat]] = {}
+    for b in beats:
+        result.setdefault(b.id_service, []).append(b)
+    return result
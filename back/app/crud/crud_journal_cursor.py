@@ -0,0 +1,36 @@
+"""
+CRUD for Journal Cursors
+"""
+from sqlalchemy import delete
+from sqlmodel import Session
+
+from app.models import JournalCursor
+
+
+async def get_journal_cursor(session: Session, id_service: int) -> JournalCursor | None:
+    """
+    get journal cursor of a service
+    """
+    return session.get(JournalCursor, id_service)
+
+
+def set_journal_cursors(session: Session, cursors: list[JournalCursor]) -> int:
+    """
+    create or update journal cursors of many services in one transaction.
+    returns number of stored cursors
+    """
+    if not cursors:
+        return 0
+    for cursor in cursors:
+        session.merge(cursor)
+    session.commit()
+    return len(cursors)
+
+
+def delete_journal_cursor(session: Session, id_service: int):
+    """
+    delete journal cursor of a service (without commit)
+    """
+    session.exec(
+        delete(JournalCursor).where(JournalCursor.id_service == id_service) # type: ignore
+    )
@@ -7,6 +7,8 @@ import sqlalchemy.exc
 from sqlmodel import Session, select
 
 from app.core.logging import get_configed_logging
+from app.crud.crud_journal_cursor import delete_journal_cursor
+from app.crud.crud_server_metric import delete_server_metrics
 from app.models import Server, ServerCreate, ServerUpdate
 
 logging = get_configed_logging()
@@ -70,10 +72,15 @@ async def update_server(session: Session, id_server: int, server: ServerUpdate)
 
 async def delete_server_by_id(session: Session, id_server: int) -> Server | None:
     """
-    delete a server
+    delete a server.
+    its metrics and journal cursors of its services are deleted explicitly,
+    since sqlite does not enforce foreign keys
     """
     db_obj = session.get(Server, id_server)
     if db_obj:
+        for service in db_obj.services:
+            delete_journal_cursor(session=session, id_service=service.id_service) # type: ignore
+        delete_server_metrics(session=session, id_server=id_server)
         session.delete(db_obj)
         session.commit()
         return db_obj
@@ -0,0 +1,116 @@
+"""
+CRUD for Server Metrics
+"""
+from typing import Sequence
+
+from sqlalchemy import Integer, cast, delete, func, insert
+from sqlmodel import Session, select
+
+from app.models import ServerMetric, ServerMetricCreate
+
+
+def create_server_metrics(session: Session, metrics: list[ServerMetricCreate]) -> int:
+    """
+    create many server metrics with a single bulk insert.
+    returns number of inserted metrics
+    """
+    if not metrics:
+        return 0
+    session.exec(insert(ServerMetric), params=[m.model_dump() for m in metrics]) # type: ignore
+    session.commit()
+    return len(metrics)
+
+
+def rollup_server_metrics(session: Session, source: int, resolution: int, until: float) -> int:
+    """
+    aggregate `source` resolution metrics into `resolution` seconds buckets.
+    only whole buckets ending before `until` which are not rolled up yet are created.
+    returns number of created buckets
+    """
+    watermark = session.exec(
+        select(func.max(ServerMetric.timestamp)).where(ServerMetric.resolution == resolution)
+    ).one()
+    until = until // resolution * resolution
+    bucket = (cast(ServerMetric.timestamp / resolution, Integer) * resolution).label("bucket")
+    query = select(
+            ServerMetric.id_server,
+            bucket,
+            func.avg(ServerMetric.cpu_usage_percentage),
+            func.max(ServerMetric.max_cpu_usage_percentage),
+            func.avg(ServerMetric.total_memory_in_KB),
+            func.avg(ServerMetric.used_memory_in_KB),
+            func.avg(ServerMetric.total_disk_in_KB),
+            func.avg(ServerMetric.used_disk_in_KB)
+        ).where(
+            ServerMetric.resolution == source,
+            ServerMetric.timestamp < until
+        ).group_by(
+            ServerMetric.id_server,
+            bucket
+        )
+    if watermark is not None:
+        query = query.where(ServerMetric.timestamp >= watermark + resolution)
+    rows = session.exec(query).all()
+    if rows:
+        session.exec(insert(ServerMetric), params=[ # type: ignore
+            {
+                "id_server": row[0],
+                "resolution": resolution,
+                "timestamp": float(row[1]),
+                "cpu_usage_percentage": row[2],
+                "max_cpu_usage_percentage": row[3],
+                "total_memory_in_KB": row[4],
+                "used_memory_in_KB": row[5],
+                "total_disk_in_KB": row[6],
+                "used_disk_in_KB": row[7]
+            } for row in rows
+        ])
+    session.commit()
+    return len(rows)
+
+
+def delete_server_metrics_before(session: Session, resolution: int, before: float) -> int:
+    """
+    delete metrics of a resolution older than `before`
+    """
+    result = session.exec(
+        delete(ServerMetric).where( # type: ignore
+            ServerMetric.resolution == resolution, # type: ignore
+            ServerMetric.timestamp < before # type: ignore
+        )
+    )
+    session.commit()
+    return result.rowcount
+
+
+def delete_server_metrics(session: Session, id_server: int):
+    """
+    delete all metrics of a server (without commit)
+    """
+    session.exec(
+        delete(ServerMetric).where(ServerMetric.id_server == id_server) # type: ignore
+    )
+
+
+async def get_server_metrics(
+        session: Session,
+        id_server: int,
+        resolution: int,
+        start: float,
+        end: float
+    ) -> Sequence[ServerMetric]:
+    """
+    get metrics of a server in a resolution ordered by timestamp
+    """
+    return session.exec(
+            select(
+                ServerMetric
+            ).where(
+                ServerMetric.id_server == id_server,
+                ServerMetric.resolution == resolution,
+                ServerMetric.timestamp >= start,
+                ServerMetric.timestamp <= end
+            ).order_by(
+                ServerMetric.timestamp # type: ignore
+            )
+        ).all()
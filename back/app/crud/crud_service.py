@@ -6,6 +6,7 @@ from typing import Sequence
 from sqlmodel import Session, select
 
 from app.core.logging import get_configed_logging
+from app.crud.crud_journal_cursor import delete_journal_cursor
 from app.models import Service, ServiceCreate, ServiceUpdate, ServiceTypeEnum
 
 logging = get_configed_logging()
@@ -34,6 +35,20 @@ async def get_service_by_id(session: Session, id_service: int) -> Service | None
     return session.get(Service, id_service)
 
 
+async def get_services_by_ids(session: Session, id_services: list[int]) -> Sequence[Service]:
+    """
+    Get services by list of ids
+    """
+    services = session.exec(
+            select(
+                Service
+            ).where(
+                Service.id_service.in_(id_services) # type: ignore
+            )
+        ).all()
+    return services
+
+
 async def get_all_services_by_server(session: Session, id_server:int, offset: int = 0, limit: int = 0) -> Sequence[Service]:
     """
     Get All Services of a server
@@ -85,10 +100,12 @@ async def update_service(
 
 async def delete_service_by_id(session: Session, id_service: int) -> Service | None:
     """
-    delete a service by id
+    delete a service by id.
+    its journal cursor is deleted explicitly, since sqlite does not enforce foreign keys
     """
     db_obj = session.get(Service, id_service)
     if db_obj:
+        delete_journal_cursor(session=session, id_service=id_service)
         session.delete(db_obj)
         session.commit()
         return db_obj
@@ -14,17 +14,21 @@ from app.api.api import api_router
 from app.api.deps import get_db
 from app.core.logging import get_configed_logging
 from app.models.server import Server
-from app.src import callbacks
+from app.src import callbacks, checker
+from app.src.beat_cache import MAX_CHART_BARS, BeatCache
+from app.src.beat_writer import BeatWriter
 from app.src.connection_manager import (ServerConnectionManager,
-                                        ServiceConnectionManager, SSHManager,
-                                        get_ssh_clint)
-from app.src.task import update_live_board, update_server_load_board
+                                        ServiceConnectionManager, SSHManager)
+from app.src.task import (BeatScheduler, update_live_board,
+                          update_server_load_board)
 
 logging = get_configed_logging()
 logger = logging.getLogger(__name__)
 
 logger.info("statring ...")
 
+SHUTDOWN_TIMEOUT = 30
+
 
 @asynccontextmanager
 async def lifespan(_):
@@ -37,31 +41,51 @@ async def lifespan(_):
     def update_server_load_board_runner():
         asyncio.run(update_server_load_board())
 
-    SSHManager()
+    async def warm_up(id_servers: list[int]):
+        try:
+            await sshm.warm_up(id_servers=id_servers)
+        finally:
+            scheduler.release()
+
+    sshm = SSHManager()
     ServerConnectionManager()
     ServiceConnectionManager()
+    scheduler = BeatScheduler()
+    # checks wait for ssh warm-up
+    scheduler.hold()
+    BeatWriter().start()
     # STARTING UP
     with next(get_db()) as session:
         servers = session.exec(select(Server)).all()
-        for i in servers:
-            # asyncio.create_task(sshm.get_ssh_client(id_server=i.id_server, server=None))
-            Thread(
-                target=get_ssh_clint,
-                args=(i.id_server,),
-                daemon=True,
-                name="get ssh client"
-            ).start()
+        BeatCache().warm(
+            await crud.beat.get_latest_beats(session=session, limit=MAX_CHART_BARS)
+        )
         services = await crud.service.get_all_services(session=session, offset=0, limit=-1)
-        ids = [i.id_service for i in services]
-        for i in ids:
-            if i:
-                Thread(
-                    target=callbacks.beater_callback,
-                    args=(i,),
-                    daemon=True,
-                    name="beater callback"
-                ).start()
+        for i in services:
+            if i.id_service:
+                # first checks are spread on phase of each service within its interval
+                scheduler.schedule(
+                    id_service=i.id_service,
+                    service_type=i.service_type,
+                    id_server=i.id_server,
+                    interval=i.config.interval if i.config else None,
+                    phase_key=checker.online_phase_key(i)
+                )
+    warm_up_task = asyncio.create_task(
+        warm_up(id_servers=[i.id_server for i in servers if i.id_server])
+    )
 
+    scheduler_thread = Thread(
+        target=callbacks.scheduler_callback,
+        daemon=True,
+        name="beat scheduler"
+    )
+    scheduler_thread.start()
+    Thread(
+        target=callbacks.ssh_supervisor_callback,
+        daemon=True,
+        name="ssh supervisor"
+    ).start()
     Thread(
         target=update_live_board_runner,
         daemon=True,
@@ -76,6 +100,10 @@ async def lifespan(_):
     yield
 
     # SHUTTING DOWN
+    warm_up_task.cancel()
+    scheduler.stop()
+    await asyncio.to_thread(scheduler_thread.join, SHUTDOWN_TIMEOUT)
+    await asyncio.to_thread(BeatWriter().close, SHUTDOWN_TIMEOUT)
 
 
 app = FastAPI(lifespan=lifespan, title="HeartBeat")
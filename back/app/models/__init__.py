@@ -8,8 +8,11 @@ from .config import (Config, ConfigBaseJournal, ConfigBaseOnline,
                      ConfigBaseSystemd, ConfigCreate, ConfigUpdate,
                      ConfigUpdateJournal, ConfigUpdateOnline,
                      ConfigUpdateSystemd, ConfigWithService)
+from .journal_cursor import JournalCursor
 from .server import (Server, ServerCreate, ServerDetail, ServerPublic,
                      ServerUpdate)
+from .server_metric import (ServerMetric, ServerMetricCreate,
+                            ServerMetricPublic, ServerMetrics)
 from .service import (Service, ServiceBase, ServiceCreate, ServiceTypeEnum,
                       ServiceUpdate, ServiceWithBeats, ServiceWithConfig)
 
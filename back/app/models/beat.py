@@ -1,7 +1,7 @@
 """
 Beat model (based on SQLModel)
 """
-from sqlmodel import Field, SQLModel
+from sqlmodel import Field, Index, SQLModel
 
 
 class BeatCreate(SQLModel):
@@ -24,6 +24,10 @@ class Beat(BeatCreate, table=True):
     """
     Service Beats Table Model
     """
+    __table_args__ = (
+        Index("ix_beat_id_service_timestamp", "id_service", "timestamp"),
+    )
+
     id_beat: int | None = Field(default=None, primary_key=True)
 
     # service: Service = Relationship(back_populates='beats')
@@ -26,6 +26,7 @@ class OnlineOperatorEnaum(str, Enum):
     NOTIN = "not in"
     EQ = "=="
     NE = "!="
+    REGEX = "regex"
 
 
 class JournalOperatorEnaum(str, Enum):
@@ -34,6 +35,7 @@ class JournalOperatorEnaum(str, Enum):
     """
     IN = "in"
     NOTIN = "not in"
+    REGEX = "regex"
 
 
 class TargetEnaum(str, Enum):
@@ -44,6 +46,14 @@ class TargetEnaum(str, Enum):
     CONTENT = "content"
 
 
+class ExecutionEnum(str, Enum):
+    """
+    Where online checks run: on the server over ssh with curl, or directly from backend
+    """
+    SSH = "ssh"
+    DIRECT = "direct"
+
+
 class ConfigBase(SQLModel):
     """
     Config base config
@@ -75,6 +85,7 @@ class ConfigBaseOnline(ConfigBase):
     operator: OnlineOperatorEnaum = Field(nullable=False, default=OnlineOperatorEnaum.EQ)
     target: TargetEnaum = Field(nullable=False, default=TargetEnaum.STATUS)
     data: dict | None = Field(nullable=True, default=None)
+    execution: ExecutionEnum = Field(nullable=False, default=ExecutionEnum.SSH)
 
 
 class ConfigCreate(ConfigBase):
@@ -88,6 +99,7 @@ class ConfigCreate(ConfigBase):
     operator: OnlineOperatorEnaum | None = Field(default=None)
     target: TargetEnaum | None = Field(default=None)
     data: str | None = Field(nullable=True, default=None)
+    execution: ExecutionEnum | None = Field(default=None, sa_column_kwargs={"server_default": ExecutionEnum.SSH.name})
 
 
 class ConfigUpdateSystemd(SQLModel):
@@ -117,6 +129,7 @@ class ConfigUpdateOnline(ConfigBase):
     operator: OnlineOperatorEnaum | None = Field(default=None)
     target: TargetEnaum | None = Field(default=None)
     data: str | None = Field(nullable=True, default=None)
+    execution: ExecutionEnum | None = Field(default=None)
 
 
 class ConfigUpdate(SQLModel):
@@ -129,6 +142,7 @@ class ConfigUpdate(SQLModel):
     operator: OnlineOperatorEnaum | None = Field(default=None)
     target: TargetEnaum | None = Field(default=None)
     data: str | None = Field(nullable=True, default=None)
+    execution: ExecutionEnum | None = Field(default=None)
     interval: float | None = Field(default=None, ge=10.0)
 
 
@@ -0,0 +1,22 @@
+"""
+Journal Cursor model (based on SQLModel)
+"""
+from sqlmodel import Field, SQLModel
+
+
+class JournalCursor(SQLModel, table=True):
+    """
+    Journal Cursor Table Model.
+    position of journalctl checks of a service in its journal
+    and whether desired response was found in its latest new lines
+    """
+    __tablename__ = "journal_cursor" # type: ignore
+
+    id_service: int = Field(
+        foreign_key='service.id_service',
+        primary_key=True,
+        ondelete="CASCADE"
+    )
+    cursor: str | None = Field(nullable=True, default=None)
+    matched: bool = Field(nullable=False, default=False)
+    timestamp: float = Field(nullable=False)
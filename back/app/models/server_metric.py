@@ -0,0 +1,60 @@
+"""
+Server Metric model (based on SQLModel)
+"""
+from sqlmodel import Field, Index, SQLModel
+
+
+class ServerMetricCreate(SQLModel):
+    """
+    Server Metric Create Schema.
+    resolution is the bucket size in seconds (0 for raw samples)
+    """
+    id_server: int = Field(
+        foreign_key='server.id_server',
+        nullable=False,
+        ondelete="CASCADE"
+    )
+    resolution: int = Field(nullable=False, default=0)
+    timestamp: float = Field(nullable=False)
+    cpu_usage_percentage: float | None = Field(nullable=True, default=None)
+    max_cpu_usage_percentage: float | None = Field(nullable=True, default=None)
+    total_memory_in_KB: float | None = Field(nullable=True, default=None)
+    used_memory_in_KB: float | None = Field(nullable=True, default=None)
+    total_disk_in_KB: float | None = Field(nullable=True, default=None)
+    used_disk_in_KB: float | None = Field(nullable=True, default=None)
+
+
+class ServerMetric(ServerMetricCreate, table=True):
+    """
+    Server Metrics Table Model
+    """
+    __tablename__ = "server_metric" # type: ignore
+    __table_args__ = (
+        Index("ix_server_metric_id_server_resolution_timestamp", "id_server", "resolution", "timestamp"),
+    )
+
+    id_server_metric: int | None = Field(default=None, primary_key=True)
+
+
+class ServerMetricPublic(SQLModel):
+    """
+    Server Metric response model
+    """
+    timestamp: float
+    cpu_usage_percentage: float | None = None
+    max_cpu_usage_percentage: float | None = None
+    total_memory_in_KB: float | None = None
+    used_memory_in_KB: float | None = None
+    total_disk_in_KB: float | None = None
+    used_disk_in_KB: float | None = None
+
+
+class ServerMetrics(SQLModel):
+    """
+    Server Metrics of a time range in one resolution
+    """
+    id_server: int
+    resolution: int
+    start: float
+    end: float
+    data: list[ServerMetricPublic]
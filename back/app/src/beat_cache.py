@@ -0,0 +1,138 @@
+"""
+In memory cache of recent beats of every service
+"""
+import math
+import os
+import threading
+from array import array
+
+from dotenv import load_dotenv
+
+from app.core.logging import get_configed_logging
+from app.models import Beat, BeatCreate
+from app.src.connection_manager import Singleton
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+load_dotenv()
+MAX_CHART_BARS = int(os.getenv("MAX_CHART_BARS", "50"))
+
+
+def serialize_beat(beat: Beat | BeatCreate) -> dict:
+    """
+    serialize a beat like `BeatPublic`
+    """
+    return {
+        "Active": beat.Active,
+        "latency": beat.latency,
+        "timestamp": beat.timestamp,
+        "server_status": beat.server_status
+    }
+
+
+class BeatRing:
+    """
+    fixed size, array backed ring buffer of recent beats of a service
+    """
+    __slots__ = ("size", "start", "count", "timestamp", "active", "latency", "server_status")
+
+    def __init__(self, size: int = MAX_CHART_BARS):
+        self.size = size
+        self.start = 0
+        self.count = 0
+        self.timestamp = array("d", [0.0]) * size
+        self.active = array("b", [0]) * size
+        # NaN stands for unknown latency
+        self.latency = array("d", [math.nan]) * size
+        self.server_status = array("b", [0]) * size
+
+
+    def append(self, beat: Beat | BeatCreate):
+        """
+        add a beat, overwriting the oldest one when ring is full
+        """
+        if self.count < self.size:
+            i = (self.start + self.count) % self.size
+            self.count += 1
+        else:
+            i = self.start
+            self.start = (self.start + 1) % self.size
+        self.timestamp[i] = beat.timestamp
+        self.active[i] = beat.Active
+        self.latency[i] = math.nan if beat.latency is None else beat.latency
+        self.server_status[i] = beat.server_status
+
+
+    def to_list(self) -> list[dict]:
+        """
+        beats from oldest to newest, serialized like `BeatPublic`
+        """
+        beats = []
+        for n in range(self.count):
+            i = (self.start + n) % self.size
+            latency = self.latency[i]
+            beats.append({
+                "Active": bool(self.active[i]),
+                "latency": None if math.isnan(latency) else latency,
+                "timestamp": self.timestamp[i],
+                "server_status": bool(self.server_status[i])
+            })
+        return beats
+
+
+class BeatCache(Singleton):
+    """
+    Singleton based cache of the last `MAX_CHART_BARS` beats of each service
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            cls.rings: dict[int, BeatRing] = {}
+            cls.lock = threading.Lock()
+            logger.debug("Beat Cache initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def add(cls, beat: Beat | BeatCreate):
+        """
+        add a new beat of a service
+        """
+        with cls.lock:
+            ring = cls.rings.get(beat.id_service)
+            if ring is None:
+                ring = cls.rings[beat.id_service] = BeatRing()
+            ring.append(beat)
+
+
+    @classmethod
+    def warm(cls, beats: dict[int, list[Beat]]):
+        """
+        fill cache with beats loaded from database, ordered by timestamp
+        """
+        with cls.lock:
+            for id_service, service_beats in beats.items():
+                ring = cls.rings[id_service] = BeatRing()
+                for b in service_beats[-ring.size:]:
+                    ring.append(b)
+        logger.info("Beat Cache warmed up for %d services", len(beats))
+
+
+    @classmethod
+    def get(cls, id_service: int) -> list[dict]:
+        """
+        recent beats of a service from oldest to newest
+        """
+        with cls.lock:
+            ring = cls.rings.get(id_service)
+            return ring.to_list() if ring else []
+
+
+    @classmethod
+    def remove(cls, id_service: int):
+        """
+        drop cached beats of a deleted service
+        """
+        with cls.lock:
+            cls.rings.pop(id_service, None)
@@ -0,0 +1,213 @@
+"""
+Write-behind buffer for beats and journal cursors of all beaters
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from app import crud
+from app.api.deps import get_db
+from app.core.logging import get_configed_logging
+from app.models import BeatCreate, JournalCursor
+from app.src.connection_manager import Singleton
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+load_dotenv()
+BEAT_WRITER_FLUSH_INTERVAL = float(os.getenv("BEAT_WRITER_FLUSH_INTERVAL", "0.5"))
+BEAT_WRITER_BATCH_SIZE = int(os.getenv("BEAT_WRITER_BATCH_SIZE", "500"))
+BEAT_WRITER_MAX_SIZE = int(os.getenv("BEAT_WRITER_MAX_SIZE", "10000"))
+BEAT_WRITER_RETRIES = 3
+
+
+class BeatWriter(Singleton):
+    """
+    Singleton based write-behind buffer.
+    beats are collected from all beaters and flushed by a writer thread as one bulk
+    insert every `BEAT_WRITER_FLUSH_INTERVAL` seconds or `BEAT_WRITER_BATCH_SIZE` beats.
+    producers wait while `BEAT_WRITER_MAX_SIZE` beats are pending.
+    journal cursors are flushed along with beats, only latest one of each service is kept.
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            cls.buffer: deque[BeatCreate] = deque()
+            # latest pending journal cursor of each service
+            cls.cursors: dict[int, JournalCursor] = {}
+            cls.condition = threading.Condition()
+            cls.thread: threading.Thread | None = None
+            cls.closed = False
+            logger.debug("Beat Writer initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def start(cls):
+        """
+        start writer thread
+        """
+        with cls.condition:
+            if cls.thread is not None and cls.thread.is_alive():
+                return
+            cls.closed = False
+            cls.thread = threading.Thread(
+                target=cls.__run,
+                daemon=True,
+                name="beat writer"
+            )
+            cls.thread.start()
+
+
+    @classmethod
+    def close(cls, timeout: float | None = None):
+        """
+        stop writer thread after flushing all pending beats (blocking)
+        """
+        with cls.condition:
+            cls.closed = True
+            cls.condition.notify_all()
+        if cls.thread is not None:
+            cls.thread.join(timeout=timeout)
+        if cls.buffer or cls.cursors:
+            logger.error(
+                "beat writer closed with %d pending beats and %d pending cursors",
+                len(cls.buffer),
+                len(cls.cursors)
+            )
+        else:
+            logger.info("beat writer flushed and closed")
+
+
+    @classmethod
+    async def put(cls, beat: BeatCreate):
+        """
+        add a beat to buffer. waits without blocking event loop while buffer is full
+        """
+        if cls.thread is None:
+            cls.start()
+        with cls.condition:
+            if len(cls.buffer) < BEAT_WRITER_MAX_SIZE:
+                cls.__append(beat)
+                return
+        logger.warning("beat writer buffer is full, waiting for database")
+        await asyncio.to_thread(cls.__put_blocking, beat)
+
+
+    @classmethod
+    def put_cursor(cls, cursor: JournalCursor):
+        """
+        queue journal cursor of a service, replacing its pending one
+        """
+        if cls.thread is None:
+            cls.start()
+        with cls.condition:
+            cls.cursors[cursor.id_service] = cursor
+
+
+    @classmethod
+    def get_cursor(cls, id_service: int) -> JournalCursor | None:
+        """
+        pending journal cursor of a service, if it is not stored yet
+        """
+        with cls.condition:
+            return cls.cursors.get(id_service)
+
+
+    @classmethod
+    def discard_cursor(cls, id_service: int):
+        """
+        drop pending journal cursor of a deleted service
+        """
+        with cls.condition:
+            cls.cursors.pop(id_service, None)
+
+
+    @classmethod
+    def __put_blocking(cls, beat: BeatCreate):
+        """
+        wait for room in buffer and add beat
+        """
+        with cls.condition:
+            cls.condition.wait_for(
+                lambda: len(cls.buffer) < BEAT_WRITER_MAX_SIZE or cls.closed
+            )
+            cls.__append(beat)
+
+
+    @classmethod
+    def __append(cls, beat: BeatCreate):
+        """
+        add beat to buffer (condition must be held)
+        """
+        if cls.closed and (cls.thread is None or not cls.thread.is_alive()):
+            raise RuntimeError("beat writer is closed")
+        cls.buffer.append(beat)
+        if len(cls.buffer) >= BEAT_WRITER_BATCH_SIZE:
+            cls.condition.notify_all()
+
+
+    @classmethod
+    def __run(cls):
+        """
+        writer thread loop
+        """
+        while True:
+            with cls.condition:
+                cls.condition.wait_for(
+                    lambda: len(cls.buffer) >= BEAT_WRITER_BATCH_SIZE or cls.closed,
+                    timeout=BEAT_WRITER_FLUSH_INTERVAL
+                )
+                batch = [
+                    cls.buffer.popleft()
+                    for _ in range(min(len(cls.buffer), BEAT_WRITER_BATCH_SIZE))
+                ]
+                cursors = list(cls.cursors.values())
+                cls.cursors = {}
+                done = cls.closed and not cls.buffer
+                # wake up producers waiting for room
+                cls.condition.notify_all()
+            if batch:
+                cls.__flush(batch)
+            if cursors:
+                cls.__flush_cursors(cursors)
+            if done:
+                return
+
+
+    @staticmethod
+    def __flush(batch: list[BeatCreate]):
+        """
+        store a batch of beats with one bulk insert
+        """
+        for attempt in range(1, BEAT_WRITER_RETRIES + 1):
+            try:
+                with next(get_db()) as session:
+                    crud.beat.create_beats(session=session, beats=batch)
+                logger.debug("%d beats flushed", len(batch))
+                return
+            except Exception as e:
+                logger.exception(e)
+                time.sleep(BEAT_WRITER_FLUSH_INTERVAL * attempt)
+        logger.error("%d beats dropped after %d failed flushes", len(batch), BEAT_WRITER_RETRIES)
+
+
+    @classmethod
+    def __flush_cursors(cls, cursors: list[JournalCursor]):
+        """
+        store journal cursors in one transaction.
+        on failure they are queued again unless a newer one is pending
+        """
+        try:
+            with next(get_db()) as session:
+                crud.journal_cursor.set_journal_cursors(session=session, cursors=cursors)
+            logger.debug("%d journal cursors flushed", len(cursors))
+        except Exception as e:
+            logger.exception(e)
+            with cls.condition:
+                for cursor in cursors:
+                    cls.cursors.setdefault(cursor.id_service, cursor)
@@ -3,11 +3,19 @@ Callback module for running async tasks
 """
 import asyncio
 
-from app.src.task import run_beater
+from app.src.connection_manager import SSHManager
+from app.src.task import BeatScheduler
 
 
-def beater_callback(args: int):
+def scheduler_callback():
     """
-    callback to run async func of run beater task
+    callback to run async func of beat scheduler
     """
-    asyncio.run(run_beater(id_service=args))
+    asyncio.run(BeatScheduler().run())
+
+
+def ssh_supervisor_callback():
+    """
+    callback to run async func of ssh supervisor
+    """
+    asyncio.run(SSHManager().supervise())
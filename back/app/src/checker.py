@@ -2,14 +2,42 @@
 Check HB of a service in different ways such as:
 http request, systemctl status and journalctl reports
 """
+import functools
+import os
+import re
+import shlex
+import time
+from typing import Sequence
 
+import httpx
+from dotenv import load_dotenv
+from sqlmodel import Session
 
+from app import crud
 from app.core.logging import get_configed_logging
-from app.models import Service
-from app.models.config import MethodEnum
+from app.models import JournalCursor, Service, ServiceTypeEnum
+from app.models.config import (ExecutionEnum, JournalOperatorEnaum, MethodEnum,
+                               OnlineOperatorEnaum, TargetEnaum)
+from app.src import http_client
+from app.src.beat_writer import BeatWriter
+from app.src.predicates import compile_predicate
+from app.src.single_flight import SingleFlight
 
 logging = get_configed_logging()
 logger = logging.getLogger(__name__)
+load_dotenv()
+# lines of journal looked at on first check of a service (like `tail`)
+JOURNAL_LINES = int(os.getenv("JOURNAL_LINES", "10"))
+# most new matching lines sent by host on next checks
+JOURNAL_MAX_LINES = int(os.getenv("JOURNAL_MAX_LINES", "100"))
+# most bytes of response read by online content checks
+ONLINE_CONTENT_MAX_BYTES = int(os.getenv("ONLINE_CONTENT_MAX_BYTES", str(1024 * 1024)))
+# identical online checks due within this many seconds share one probe, 0 disables it
+ONLINE_COALESCE_WINDOW = float(os.getenv("ONLINE_COALESCE_WINDOW", "2"))
+JOURNAL_CURSOR_MARK = "### cursor"
+JOURNAL_ENTRIES_MARK = "### entries"
+
+online_flights = SingleFlight(name="online_checks", window=ONLINE_COALESCE_WINDOW)
 
 
 async def curl_response_parser(response: str) -> tuple[str, str, float]:
@@ -24,11 +52,191 @@ async def curl_response_parser(response: str) -> tuple[str, str, float]:
     return (status_code, content, response_time)
 
 
-async def online_service(
+class ContentReader:
+    """
+    incremental reader of an http response for content checks.
+    the predicate is decided as soon as possible (e.g. desired text is found for `in`)
+    so reading can stop before whole body is received.
+    with `headers` set, response starts with headers (`curl -D -`) which are skipped.
+    """
+    def __init__(self, operator: str, desired: str, headers: bool = False):
+        self.operator = operator
+        self.desired = desired.encode("utf-8")
+        self.headers = headers
+        self.body = bytearray()
+        self.scanned = 0
+        self.decided: bool | None = None
+
+
+    def feed(self, chunk: bytes) -> bool:
+        """
+        add a chunk of response. returns True once result is decided
+        """
+        self.body += chunk
+        while self.headers:
+            end = self.body.find(b"\r\n\r\n")
+            if end == -1:
+                return False
+            # interim (1xx) responses are followed by another header block.
+            # status code is second token of status line (`HTTP/1.1 100 ...`, `HTTP/2 201`)
+            status_line = self.body[:self.body.find(b"\r\n")]
+            parts = status_line.split(b" ", 2)
+            interim = len(parts) > 1 and parts[1][:1] == b"1"
+            del self.body[:end + 4]
+            self.headers = interim
+        self.decided = self.__decide_early()
+        return self.decided is not None
+
+
+    def result(self) -> bool:
+        """
+        result of predicate over content read so far
+        """
+        if self.decided is not None:
+            return self.decided
+        if self.headers:
+            # no response at all
+            return False
+        return compile_predicate(self.operator, self.desired.decode("utf-8"))(self.body)
+
+
+    def __decide_early(self) -> bool | None:
+        """
+        result if more content can not change it, otherwise None
+        """
+        if self.operator in (OnlineOperatorEnaum.IN.value, OnlineOperatorEnaum.NOTIN.value):
+            start = max(self.scanned - len(self.desired) + 1, 0)
+            self.scanned = len(self.body)
+            if self.body.find(self.desired, start) != -1:
+                return self.operator == OnlineOperatorEnaum.IN.value
+        elif self.operator in (OnlineOperatorEnaum.EQ.value, OnlineOperatorEnaum.NE.value):
+            if len(self.body) > len(self.desired) or not self.desired.startswith(self.body):
+                return self.operator == OnlineOperatorEnaum.NE.value
+        return None
+
+
+def curl_command(method: MethodEnum, url: str, data: str | None, status_only: bool) -> str:
+    """
+    curl command of an online check run on server.
+    status checks discard body on server, content checks get response headers and body
+    capped at `ONLINE_CONTENT_MAX_BYTES`.
+    """
+    if status_only:
+        command = 'curl -s -w "\nStatus Code: %{http_code}\nResponse Time: %{time_total}s\n" ' \
+                '-o /dev/null'
+    else:
+        command = "curl -s -D - -o /dev/stdout"
+    if method == MethodEnum.POST:
+        command += ' -X "POST" -H "accept: application/json" ' \
+                f"-H 'Content-Type: application/json' -d {shlex.quote(data or ' ')}"
+    command += f" {shlex.quote(url)}"
+    if not status_only:
+        command += f" | head -c {ONLINE_CONTENT_MAX_BYTES}"
+    return command
+
+
+def online_probe_key(service: Service) -> tuple | None:
+    """
+    key of the probe an online check runs, checks with the same key share one probe.
+    status code checks share it whatever their predicate is, content checks also need
+    the same predicate since reading stops once it is decided.
+    returns None if the check can not be shared
+    """
+    config = service.config
+    if service.service_type != ServiceTypeEnum.ONLINE or config is None or not config.url:
+        return None
+    direct = config.execution == ExecutionEnum.DIRECT
+    key = (
+        None if direct else service.id_server,
+        config.execution,
+        config.method,
+        config.url,
+        config.data,
+        config.target
+    )
+    if config.target != TargetEnaum.STATUS:
+        key += (config.operator, config.desired_response)
+    return key
+
+
+def online_phase_key(service: Service) -> str | None:
+    """
+    stable scheduler phase key of services sharing an online probe, so they are due together
+    """
+    key = online_probe_key(service)
+    if key is None:
+        return None
+    return "probe-" + "|".join(str(getattr(part, "value", part)) for part in key)
+
+
+async def drain_body(response: httpx.Response, max_bytes: int) -> bool:
+    """
+    read and discard body of a streamed response, so its connection goes back to
+    keep-alive pool. a body bigger than `max_bytes` is not read on, its connection is closed.
+    returns whether whole body was read
+    """
+    received = 0
+    async for chunk in response.aiter_bytes():
+        received += len(chunk)
+        if received > max_bytes:
+            return False
+    return True
+
+
+async def online_probe_direct(
         service: Service
-        ) -> tuple[bool, float|None, bool]:
+        ) -> tuple[str | bool | None, float | None, bool]:
     """
-    Online Service HB Check
+    probe of an online service sent from backend with shared http client
+    """
+    try:
+        if not service.config.url:
+            raise ValueError("url can not be None for Online Services")
+        client = http_client.get_client()
+        request = {"method": "GET", "url": service.config.url}
+        if service.config.method == MethodEnum.POST:
+            request.update(
+                method="POST",
+                content=service.config.data or " ",
+                headers={"accept": "application/json", "Content-Type": "application/json"}
+            )
+        started = time.perf_counter()
+        async with client.stream(
+            **request, # type: ignore
+            timeout=min(http_client.HTTP_TIMEOUT, service.config.interval)
+        ) as response:
+            if service.config.target == TargetEnaum.STATUS:
+                result: str | bool = str(response.status_code)
+                latency = time.perf_counter() - started
+                await drain_body(response=response, max_bytes=ONLINE_CONTENT_MAX_BYTES)
+            else:
+                reader = ContentReader(
+                    operator=service.config.operator.value, # type: ignore
+                    desired=service.config.desired_response or ""
+                )
+                remaining = ONLINE_CONTENT_MAX_BYTES
+                async for chunk in response.aiter_bytes():
+                    chunk = chunk[:remaining]
+                    remaining -= len(chunk)
+                    if reader.feed(chunk) or remaining <= 0:
+                        break
+                result = reader.result()
+                latency = time.perf_counter() - started
+        return (result, latency, True)
+    except httpx.HTTPError as e:
+        # endpoint did not answer, backend itself is fine
+        logger.debug("direct check of service id: %d failed: %r", service.id_service, e)
+        return (None, None, True)
+    except Exception as e:
+        logger.exception(e)
+        return (None, None, False)
+
+
+async def online_probe_ssh(
+        service: Service
+        ) -> tuple[str | bool | None, float | None, bool]:
+    """
+    probe of an online service sent from its server with curl over ssh
     """
     try:
         from app.src.connection_manager import SSHManager
@@ -47,72 +255,230 @@ async def online_service(
 
         if not service.config.url:
             raise ValueError("url can not be None for Online Services")
-        if service.config.method == MethodEnum.GET:
-            command = 'curl -s -w "\nStatus Code: %{http_code}\nResponse Time: '\
-                    '%{time_total}s\n" -o /dev/stdout ' + service.config.url
-        elif service.config.method == MethodEnum.POST:
-            data = service.config.data if service.config.data else ' '
-            command = f'curl -s -w "\nStatus Code: %{{http_code}}\nResponse Time: ' \
-                    f'%{{time_total}}s\n" -o /dev/stdout -X "POST" -H "accept: application/json" '\
-                    f"-H 'Content-Type: application/json' -d '{data}' " \
-                    + service.config.url
-
-
-        stdin, stdout, stderr = ssh.exec_command(command)
-        output = stdout.read().decode("utf-8")
-
-        status, content, latency = await curl_response_parser(response=output)
-        operand = status if service.config.target.value == "status_code" else content # type: ignore
-        condition = f"'{
-            service.config.desired_response
-            }' {service.config.operator.value} '{operand}'" # type: ignore
-        if eval(condition):
-            return (True, latency, True)
-        return (False, None, True)
+        status_only = service.config.target == TargetEnaum.STATUS
+        command = curl_command(
+            method=service.config.method, # type: ignore
+            url=service.config.url,
+            data=service.config.data,
+            status_only=status_only
+        )
+        if status_only:
+            output = await sshm.exec_command(ssh=ssh, command=command)
+            status, _, latency = await curl_response_parser(response=output)
+            return (status, latency, True)
+        # content is read incrementally and channel is closed once result is decided
+        reader = ContentReader(
+            operator=service.config.operator.value, # type: ignore
+            desired=service.config.desired_response or "",
+            headers=True
+        )
+        started = time.perf_counter()
+        await sshm.exec_stream(
+            ssh=ssh,
+            command=command,
+            consume=reader.feed,
+            max_bytes=ONLINE_CONTENT_MAX_BYTES
+        )
+        return (reader.result(), time.perf_counter() - started, True)
     except Exception as e:
         logger.exception(e)
-        return (False, None, False)
+        return (None, None, False)
 
 
-async def systemd_service_status(service: Service) -> tuple[bool, bool]:
+async def online_probe(
+        service: Service
+        ) -> tuple[str | bool | None, float | None, bool]:
     """
-    Systemd service HB Check
+    run the probe of an online check.
+    returns (status code for status code checks or whether content matched
+    for content checks, latency, server status). result is None if probe failed
+    """
+    if service.config.execution == ExecutionEnum.DIRECT:
+        return await online_probe_direct(service=service)
+    return await online_probe_ssh(service=service)
+
+
+async def online_service(
+        service: Service
+        ) -> tuple[bool, float|None, bool]:
+    """
+    Online Service HB Check.
+    identical checks which are due together share one probe (see `online_probe_key`)
     """
+    key = online_probe_key(service)
+    if key is None or ONLINE_COALESCE_WINDOW <= 0:
+        result, latency, server_status = await online_probe(service=service)
+    else:
+        result, latency, server_status = await online_flights.do(
+            key=key,
+            func=functools.partial(online_probe, service=service),
+            # a shared result is never older than half of the interval of a check
+            window=service.config.interval / 2
+        )
+    if isinstance(result, str):
+        try:
+            result = compile_predicate(
+                service.config.operator.value, # type: ignore
+                service.config.desired_response or ""
+            )(result)
+        except Exception as e:
+            logger.exception(e)
+            return (False, None, False)
+    if result:
+        return (True, latency, True)
+    return (False, None, server_status)
+
+
+def systemctl_show_parser(response: str) -> list[dict[str, str]]:
+    """
+    parse `systemctl show` response of one or more units.
+    returns one dict of properties per unit, in the same order as units were queried
+    """
+    units = []
+    properties: dict[str, str] = {}
+    for line in response.splitlines():
+        line = line.strip()
+        if not line:
+            if properties:
+                units.append(properties)
+                properties = {}
+            continue
+        key, _, value = line.partition("=")
+        properties[key] = value
+    if properties:
+        units.append(properties)
+    return units
+
+
+def unit_id(service_name: str) -> str:
+    """
+    unit id systemd reports for a service name, e.g. `nginx` -> `nginx.service`
+    """
+    if "." in service_name:
+        return service_name
+    return f"{service_name}.service"
+
+
+async def systemd_services_status(
+        services: Sequence[Service]
+        ) -> dict[int, tuple[bool, bool]]:
+    """
+    Systemd services HB Check for services of the same server in one ssh exec.
+    returns (is active, server status) per id_service
+    """
+    result: dict[int, tuple[bool, bool]] = {
+        s.id_service: (False, False) for s in services if s.id_service
+    }
     try:
         from app.src.connection_manager import SSHManager
-        logger.debug({
-            "service_name": service.service_name,
-            "desired_response": service.config.desired_response,
-            "operator": service.config.operator
-        })
-        for ch in '~!@#$%^&*()_+|}{<>?":\'\\/,':
-            if ch in service.service_name:
+        units = []
+        for service in services:
+            if any(ch in service.service_name for ch in '~!@#$%^&*()_+|}{<>?":\'\\/,'):
                 logger.info("service name must not contain non-alphanumeric characters")
-                raise ValueError("service name must not contain non-alphanumeric characters")
+                continue
+            units.append(service)
+        if not units:
+            return result
+        server = units[0].server
+        if any(s.id_server != server.id_server for s in units):
+            raise ValueError("all services of a batch must belong to the same server")
         sshm = SSHManager()
-        ssh = await sshm.get_ssh_client(server=service.server, id_server=None)
+        ssh = await sshm.get_ssh_client(server=server, id_server=None)
         if ssh is None:
             raise ConnectionError("connection could not be stablished")
 
-        stdin, stdout, stderr = ssh.exec_command(f"systemctl status {service.service_name}")
-        output = stdout.read().decode("utf-8")
+        command = "systemctl show -p Id,ActiveState,SubState -- " + " ".join(
+            shlex.quote(s.service_name) for s in units
+        )
+        output = await sshm.exec_command(ssh=ssh, command=command)
         logger.debug(
-            "service checker output for service '%s' : %s",
-            service.service_name,
+            "service checker output for services %s : %s",
+            [s.service_name for s in units],
             output
         )
-        # ssh.close()
-        return 'Active: active' in output, True
+        states = systemctl_show_parser(response=output)
+        if len(states) == len(units):
+            for service, state in zip(units, states):
+                result[service.id_service] = (state.get("ActiveState") == "active", True) # type: ignore
+            return result
+        if len(units) == 1:
+            raise ValueError(f"expected status of 1 unit but got {len(states)}")
+        # some unit was not reported, match the others by Id and check the rest one by one
+        logger.info("expected status of %d units but got %d", len(units), len(states))
+        by_id = {state.get("Id"): state for state in states}
+        for service in units:
+            state = by_id.get(unit_id(service.service_name))
+            if state is not None:
+                result[service.id_service] = (state.get("ActiveState") == "active", True) # type: ignore
+            else:
+                result.update(await systemd_services_status(services=[service]))
+        return result
     except Exception as e:
         logger.exception(e)
-        return False, False
+        return result
+
+
+async def systemd_service_status(service: Service) -> tuple[bool, bool]:
+    """
+    Systemd service HB Check
+    """
+    logger.debug({
+        "service_name": service.service_name,
+        "desired_response": service.config.desired_response,
+        "operator": service.config.operator
+    })
+    res = await systemd_services_status(services=[service])
+    return res.get(service.id_service, (False, False)) # type: ignore
+
+
+def journalctl_command(
+        service_name: str,
+        desired: str,
+        cursor: str | None,
+        regex: bool = False
+    ) -> str:
+    """
+    journalctl command of a check. cursor of the latest entry is read first, then
+    new lines after `cursor` which match desired response (text or regex) are filtered on host.
+    without a cursor last `JOURNAL_LINES` lines are read.
+    """
+    unit = shlex.quote(service_name)
+    if cursor:
+        pattern = desired if regex else re.escape(desired)
+        window = f"--after-cursor={shlex.quote(cursor)} -n {JOURNAL_MAX_LINES} " \
+                f"-g {shlex.quote(pattern)}"
+    else:
+        window = f"-n {JOURNAL_LINES}"
+    return f"echo '{JOURNAL_CURSOR_MARK}'; " \
+            f"journalctl -u {unit} --no-pager -q -o cat -n 1 --show-cursor | tail -n 1; " \
+            f"echo '{JOURNAL_ENTRIES_MARK}'; " \
+            f"journalctl -u {unit} --no-pager -q -o cat {window}"
+
+
+def journalctl_parser(response: str) -> tuple[str | None, list[str]]:
+    """
+    parse journalctl check response.
+    returns: (cursor of latest entry, new lines)
+    """
+    cursor, lines, section = None, [], None
+    for line in response.splitlines():
+        if line in (JOURNAL_CURSOR_MARK, JOURNAL_ENTRIES_MARK):
+            section = line
+        elif section == JOURNAL_CURSOR_MARK and line.startswith("-- cursor: "):
+            cursor = line[len("-- cursor: "):].strip()
+        elif section == JOURNAL_ENTRIES_MARK:
+            lines.append(line)
+    return cursor, lines
 
 
 async def journalctl(
-        service: Service
+        service: Service,
+        session: Session
         ) -> tuple[bool, bool]:
     """
-    Journalctl reports HB Check
+    Journalctl reports HB Check.
+    only lines written since previous check are looked at, journal cursor of
+    each service is kept in database. without new lines previous result is kept.
     """
     try:
         from app.src.connection_manager import SSHManager
@@ -129,13 +495,44 @@ async def journalctl(
         ssh = await sshm.get_ssh_client(server=service.server, id_server=None)
         if ssh is None:
             raise ConnectionError("connection could not be stablished")
-        stdin, stdout, stderr = ssh.exec_command(f"journalctl -u {service.service_name} | tail")
-        output = stdout.read().decode("utf-8")
-        condition_str = f'"{
-            service.config.desired_response
-            }" {service.config.operator.value} """{output}"""'
-        condition = eval(condition_str)
-        return condition, True
+        desired = service.config.desired_response or ""
+        operator = service.config.operator.value # type: ignore
+        # `not in` is checked as `in` and negated, so previous result can be kept
+        match = compile_predicate(
+            JournalOperatorEnaum.IN.value if operator == JournalOperatorEnaum.NOTIN.value else operator,
+            desired
+        )
+        # a cursor which is not flushed yet is newer than stored one
+        state = BeatWriter().get_cursor(id_service=service.id_service) or \
+            await crud.journal_cursor.get_journal_cursor(
+                session=session,
+                id_service=service.id_service # type: ignore
+            )
+        output = await sshm.exec_command(
+            ssh=ssh,
+            command=journalctl_command(
+                service_name=service.service_name,
+                desired=desired,
+                cursor=state.cursor if state else None,
+                regex=operator == JournalOperatorEnaum.REGEX.value
+            )
+        )
+        cursor, lines = journalctl_parser(response=output)
+        if state and state.cursor and cursor == state.cursor:
+            matched = state.matched
+        else:
+            # host side filter may be case insensitive, so match exactly here
+            matched = any(match(line) for line in lines)
+        # stored by write-behind beat writer, so a check never waits for a commit
+        BeatWriter().put_cursor(JournalCursor(
+            id_service=service.id_service, # type: ignore
+            cursor=cursor or (state.cursor if state else None),
+            matched=matched,
+            timestamp=time.time()
+        ))
+        if operator == JournalOperatorEnaum.NOTIN.value:
+            return not matched, True
+        return matched, True
     except Exception as e:
         logger.exception(e)
         return False, False
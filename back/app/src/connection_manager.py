@@ -2,23 +2,71 @@
 Connection Manager to manage websockets and ssh clients
 """
 import asyncio
-from typing import Optional
+import functools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
+import orjson
 import paramiko
 import paramiko.util
 import paramiko.ssh_exception
+from dotenv import load_dotenv
 from fastapi import WebSocket
 
 from app.api.deps import get_db
+from app.core import metrics
 from app.core.logging import get_configed_logging
 from app.models import Server
+from app.src.probe import END_MARK, PROBE_COMMAND, ServerProbe, stream_command
+from app.src.ssh_pool import PoolWaitTimeout, SSHPool
 
 
 logging = get_configed_logging()
 logger = logging.getLogger(__name__)
+load_dotenv()
+SSH_EXECUTOR_WORKERS = int(os.getenv("SSH_EXECUTOR_WORKERS", "64"))
+SSH_CONNECT_TIMEOUT = float(os.getenv("SSH_CONNECT_TIMEOUT", "10"))
+SSH_COMMAND_TIMEOUT = float(os.getenv("SSH_COMMAND_TIMEOUT", "30"))
+# bytes read at once from a streamed command output
+SSH_STREAM_CHUNK = 32 * 1024
+SSH_WARMUP_CONCURRENCY = int(os.getenv("SSH_WARMUP_CONCURRENCY", "16"))
+SSH_KEEPALIVE_INTERVAL = int(os.getenv("SSH_KEEPALIVE_INTERVAL", "15"))
+SSH_HEALTH_INTERVAL = float(os.getenv("SSH_HEALTH_INTERVAL", "30"))
+SSH_HEALTH_TIMEOUT = float(os.getenv("SSH_HEALTH_TIMEOUT", "5"))
+SSH_RECONNECT_BASE = float(os.getenv("SSH_RECONNECT_BASE", "1"))
+SSH_RECONNECT_MAX = float(os.getenv("SSH_RECONNECT_MAX", "300"))
+# transports per server and concurrent channels per transport, keep channels below sshd MaxSessions
+SSH_POOL_MIN_TRANSPORTS = int(os.getenv("SSH_POOL_MIN_TRANSPORTS", "1"))
+SSH_POOL_MAX_TRANSPORTS = int(os.getenv("SSH_POOL_MAX_TRANSPORTS", "2"))
+SSH_POOL_MAX_CHANNELS = int(os.getenv("SSH_POOL_MAX_CHANNELS", "8"))
+SSH_POOL_WAIT_TIMEOUT = float(os.getenv("SSH_POOL_WAIT_TIMEOUT", "10"))
+SERVER_METRICS_STREAM = os.getenv("SERVER_METRICS_STREAM", "false").lower() in ("1", "true", "yes")
+SERVER_METRICS_INTERVAL = float(os.getenv("SERVER_METRICS_INTERVAL", "1"))
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
 
 # paramiko.util.log_to_file("paramiko.log", level=10)
 
+def reconnect_delay(failures: int) -> float:
+    """
+    exponential backoff with jitter before next reconnect attempt
+    """
+    delay = min(SSH_RECONNECT_MAX, SSH_RECONNECT_BASE * 2 ** failures)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def encode(message: Any) -> str:
+    """
+    encode a websocket message to json text once, so it can be sent to many websockets
+    """
+    return orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
 class Singleton:
     """
     Singleton BaseClass
@@ -40,46 +88,302 @@ class SSHManager(Singleton):
     def __init__(cls):
         try:
             cls.active_connections: dict[int, paramiko.SSHClient] = {}
+            # manager is shared by threads of many event loops, so locking is thread based
+            cls.lock = threading.RLock()
+            # in-flight connect of each server, shared by all callers of any loop
+            cls.connecting: dict[int, Future] = {}
+            cls.warmup = {
+                "ready": False,
+                "total": 0,
+                "connected": 0,
+                "failed": 0,
+                "started_at": None,
+                "seconds_to_ready": None
+            }
+            # blocking paramiko calls run here so they never stall an event loop
+            cls.executor = ThreadPoolExecutor(
+                max_workers=SSH_EXECUTOR_WORKERS,
+                thread_name_prefix="ssh"
+            )
+            # servers waiting for supervisor to reconnect: id_server -> (failures, due time)
+            cls.reconnecting: dict[int, tuple[int, float]] = {}
+            cls.reconnect_tasks: dict[int, asyncio.Task] = {}
+            # transport pool of each registered ssh client
+            cls.pools: dict[paramiko.SSHClient, SSHPool] = {}
+            cls.probe = ServerProbe()
+            # long lived metrics streams (see `start_metrics_stream`)
+            cls.streams: dict[int, asyncio.Task] = {}
+            cls.stream_channels: dict[int, paramiko.Channel] = {}
+            cls.streamed_status: dict[int, tuple[float, dict]] = {}
+            cls.streams_lock = threading.Lock()
             logger.debug("SSH Manager initialized")
         except Exception as e:
             logger.exception(e)
 
 
+    @classmethod
+    async def run_blocking(cls, func: Callable[[], Any], timeout: float) -> Any:
+        """
+        run a blocking function on ssh executor and wait for it at most `timeout` seconds
+        """
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(
+            loop.run_in_executor(cls.executor, func),
+            timeout=timeout
+        )
+
+
+    @staticmethod
+    def __read_blocking(ssh: paramiko.SSHClient, command: str, timeout: float) -> str:
+        """
+        run a command and read whole of its stdout (blocking)
+        """
+        _, stdout, _ = ssh.exec_command(command, timeout=timeout)
+        return stdout.read().decode("utf-8")
+
+
+    @staticmethod
+    def __stream_blocking(
+            ssh: paramiko.SSHClient,
+            command: str,
+            timeout: float,
+            consume: Callable[[bytes], bool],
+            max_bytes: int
+        ) -> int:
+        """
+        run a command and feed its stdout to `consume` chunk by chunk (blocking).
+        reading stops once `consume` returns True or `max_bytes` are read,
+        channel is closed then so command does not keep sending.
+        returns number of bytes read
+        """
+        _, stdout, _ = ssh.exec_command(command, timeout=timeout)
+        channel = stdout.channel
+        received = 0
+        try:
+            while received < max_bytes:
+                chunk = channel.recv(min(SSH_STREAM_CHUNK, max_bytes - received))
+                if not chunk:
+                    break
+                received += len(chunk)
+                if consume(chunk):
+                    metrics.incr("ssh_stream_stopped_early")
+                    break
+            else:
+                metrics.incr("ssh_stream_capped")
+        finally:
+            channel.close()
+        return received
+
+
+    @classmethod
+    def __exec_blocking(cls, ssh: paramiko.SSHClient, run: Callable[[paramiko.SSHClient], Any]) -> Any:
+        """
+        run a command on a free channel of server's transport pool (blocking).
+        a channel rejected by server is retried once after waiting for a slot again
+        """
+        pool = cls.pools.get(ssh)
+        if pool is None:
+            return run(ssh)
+        for attempt in range(2):
+            client = pool.acquire(timeout=SSH_POOL_WAIT_TIMEOUT)
+            try:
+                return run(client)
+            except paramiko.ssh_exception.ChannelException:
+                metrics.incr("ssh_channel_rejected")
+                if attempt:
+                    raise
+            finally:
+                pool.release(client)
+        raise RuntimeError("unreachable")
+
+
+    @classmethod
+    async def exec_command(
+        cls,
+        ssh: paramiko.SSHClient,
+        command: str,
+        timeout: float = SSH_COMMAND_TIMEOUT
+        ) -> str:
+        """
+        run a command on ssh client without blocking event loop and return its stdout.
+        fails fast while connection is down and supervisor is reconnecting it
+        """
+        cls.__check_transport(ssh)
+        run = functools.partial(cls.__read_blocking, command=command, timeout=timeout)
+        return await cls.__run_pooled(ssh=ssh, run=run, timeout=timeout)
+
+
+    @classmethod
+    async def exec_stream(
+        cls,
+        ssh: paramiko.SSHClient,
+        command: str,
+        consume: Callable[[bytes], bool],
+        max_bytes: int,
+        timeout: float = SSH_COMMAND_TIMEOUT
+        ) -> int:
+        """
+        run a command on ssh client without blocking event loop and feed its stdout
+        to `consume` incrementally until it returns True or `max_bytes` are read.
+        `consume` runs on ssh executor thread. returns number of bytes read
+        """
+        cls.__check_transport(ssh)
+        run = functools.partial(
+            cls.__stream_blocking,
+            command=command,
+            timeout=timeout,
+            consume=consume,
+            max_bytes=max_bytes
+        )
+        return await cls.__run_pooled(ssh=ssh, run=run, timeout=timeout)
+
+
+    @classmethod
+    async def __run_pooled(
+            cls,
+            ssh: paramiko.SSHClient,
+            run: Callable[[paramiko.SSHClient], Any],
+            timeout: float
+        ) -> Any:
+        """
+        wait on event loop for a channel slot of server's pool, then run on ssh executor.
+        a busy server never holds executor threads waiting for its channels.
+        the slot is given back when the executor call is done, even if caller timed out
+        """
+        pool = cls.pools.get(ssh)
+        if pool is None:
+            return await cls.run_blocking(
+                functools.partial(cls.__exec_blocking, ssh, run),
+                timeout=timeout
+            )
+        slots = pool.loop_slots()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=SSH_POOL_WAIT_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            metrics.incr("ssh_pool_wait_timeouts")
+            raise PoolWaitTimeout(f"no free ssh channel on server id: {pool.id_server}") from e
+        try:
+            future = asyncio.get_running_loop().run_in_executor(
+                cls.executor,
+                functools.partial(cls.__exec_blocking, ssh, run)
+            )
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return await asyncio.wait_for(
+            asyncio.shield(future),
+            timeout=timeout + SSH_POOL_WAIT_TIMEOUT
+        )
+
+
+    @staticmethod
+    def __check_transport(ssh: paramiko.SSHClient):
+        """
+        fail fast while connection is down and supervisor is reconnecting it
+        """
+        transport = ssh.get_transport()
+        if transport is None or not transport.is_active():
+            metrics.incr("ssh_short_circuited")
+            raise ConnectionError("ssh connection is down, waiting for reconnect")
+
+
     @classmethod
     async def __connect(cls, ssh: paramiko.SSHClient, channel: int):
         """
-        add a SSH client to manager
+        add a connected SSH client to manager
         """
         try:
-            cls.active_connections.update({channel: ssh})
+            with cls.lock:
+                old = cls.active_connections.get(channel)
+                cls.active_connections.update({channel: ssh})
+                old_pool = cls.pools.pop(old, None) if old is not ssh else None # type: ignore
+            if old is not None and old is not ssh:
+                # a replaced client must not leak its transports
+                if old_pool is not None:
+                    old_pool.close()
+                old.close()
             logger.debug("channel : %d created and new ssh client subscribed.", channel)
         except Exception as e:
             logger.exception(e)
 
 
     @classmethod
-    async def disconnect(cls, ssh: paramiko.SSHClient | None = None, channel: int | None = None):
+    async def disconnect(
+            cls,
+            ssh: paramiko.SSHClient | None = None,
+            channel: int | None = None,
+            keep_reconnecting: bool = False
+        ):
         """"
-        remove ssh from manager
+        remove ssh from manager and close it, dropping its metrics stream and cpu sample.
+        supervisor keeps the server marked as reconnecting, so checks do not wait
+        for its reconnect attempt
         """
         try:
-            logger.debug("disconnecting ssh client from channel :%d, current active connections %s", channel, cls.active_connections)
-            if channel is not None and channel in cls.active_connections:
-                cls.active_connections.pop(channel)
-            elif ssh is not None:
-                for ch in cls.active_connections.items():
-                    if ssh == ch[1]:
-                        channel = ch[0]
-                        break
-                cls.active_connections.pop(channel) # type: ignore
-            else:
-                raise ValueError("both ssh and channel can not be None")
+            logger.debug("disconnecting ssh client from channel :%s, current active connections %s", channel, cls.active_connections)
+            with cls.lock:
+                if channel is None and ssh is None:
+                    raise ValueError("both ssh and channel can not be None")
+                if channel is None:
+                    for ch in cls.active_connections.items():
+                        if ssh == ch[1]:
+                            channel = ch[0]
+                            break
+                if channel is not None:
+                    ssh = cls.active_connections.pop(channel, ssh)
+                    if not keep_reconnecting:
+                        cls.reconnecting.pop(channel, None)
+                pool = cls.pools.pop(ssh, None) if ssh is not None else None # type: ignore
+            if pool is not None:
+                pool.close()
+            if ssh is not None:
+                ssh.close()
 
-            logger.debug("ssh client unsubscribed from channel :%d", channel)
+            cls.stop_metrics_stream(id_server=channel) # type: ignore
+            if channel is not None:
+                # cpu counters of a reconnected (maybe rebooted) server are not comparable
+                cls.probe.forget(id_server=channel)
+            logger.debug("ssh client unsubscribed from channel :%s", channel)
         except Exception as e:
             logger.exception(e)
 
 
+    @classmethod
+    async def warm_up(cls, id_servers: list[int]):
+        """
+        connect to servers concurrently, at most `SSH_WARMUP_CONCURRENCY` at a time.
+        progress is kept in `warmup` and servers which fail are left to supervisor
+        """
+        semaphore = asyncio.Semaphore(SSH_WARMUP_CONCURRENCY)
+        started = time.monotonic()
+        cls.warmup.update(
+            ready=False,
+            total=len(id_servers),
+            connected=0,
+            failed=0,
+            started_at=time.time(),
+            seconds_to_ready=None
+        )
+
+        async def connect(id_server: int):
+            async with semaphore:
+                ssh = await cls.get_ssh_client(server=None, id_server=id_server)
+            if ssh is not None and await cls.is_active(ssh=ssh):
+                cls.warmup["connected"] += 1
+            else:
+                cls.warmup["failed"] += 1
+
+        await asyncio.gather(*[connect(i) for i in id_servers])
+        cls.warmup.update(ready=True, seconds_to_ready=round(time.monotonic() - started, 3))
+        logger.info(
+            "ssh warm-up done in %.1fs: %d connected, %d failed",
+            cls.warmup["seconds_to_ready"],
+            cls.warmup["connected"],
+            cls.warmup["failed"]
+        )
+
+
     @classmethod
     async def renew_client(cls, ssh: paramiko.SSHClient | None, id_server: int | None):
         """
@@ -95,70 +399,266 @@ class SSHManager(Singleton):
 
 
     @classmethod
-    async def is_active(cls, ssh: paramiko.SSHClient, retry: int = 1) -> bool:
+    async def is_active(cls, ssh: paramiko.SSHClient) -> bool:
         """
-        Check if 
+        Check if transport of ssh client is active.
+        an inactive client is left to supervisor to reconnect
         """
         try:
-            if ssh.get_transport():
-                res = ssh.get_transport().is_active()
-            else:
-                if retry > 0:
-                    await cls.renew_client(ssh=ssh, id_server=None)
-                    return await cls.is_active(ssh=ssh, retry=retry-1)
-            return res
+            transport = ssh.get_transport()
+            return transport is not None and transport.is_active()
         except Exception:
             return False
 
 
     @classmethod
-    async def get_server_status(cls, ssh: paramiko.SSHClient, retry: int = 1):
+    def schedule_reconnect(cls, id_server: int):
+        """
+        ask supervisor to reconnect a server as soon as possible
+        """
+        if id_server not in cls.reconnecting:
+            cls.reconnecting[id_server] = (0, time.monotonic())
+
+
+    @classmethod
+    async def supervise(cls):
+        """
+        supervisor loop. reconnects dead connections with backoff and jitter and probes
+        healthy ones every `SSH_HEALTH_INTERVAL` seconds to find half-open connections.
+        """
+        last_probe = time.monotonic()
+        while True:
+            try:
+                for id_server, ssh in list(cls.active_connections.items()):
+                    if not await cls.is_active(ssh=ssh):
+                        cls.schedule_reconnect(id_server=id_server)
+                now = time.monotonic()
+                for id_server, (_, due) in list(cls.reconnecting.items()):
+                    if due <= now and id_server not in cls.reconnect_tasks:
+                        cls.reconnect_tasks[id_server] = asyncio.create_task(
+                            cls.__reconnect(id_server=id_server)
+                        )
+                if now - last_probe >= SSH_HEALTH_INTERVAL:
+                    last_probe = now
+                    await asyncio.gather(*[
+                        cls.__probe_health(id_server=id_server, ssh=ssh)
+                        for id_server, ssh in list(cls.active_connections.items())
+                        if id_server not in cls.reconnecting
+                    ])
+            except Exception as e:
+                logger.exception(e)
+            await asyncio.sleep(1)
+
+
+    @classmethod
+    async def __probe_health(cls, id_server: int, ssh: paramiko.SSHClient):
         """
-        get system resource balance
+        run a no-op command; a connection which does not answer is half-open and is closed.
+        probe does not wait for a channel slot of server's pool, so a busy server
+        is not mistaken for a broken one
         """
         try:
-            # check memory status
-            _, stdout, _ = ssh.exec_command("free -m")
-            output = stdout.read().decode("utf-8")
-            splited_output = [i.strip().split() for i in output.split('\n')]
-            memory = int(splited_output[1][1])
-            used_memory = int(splited_output[1][2])
-
-            # check dick status
-            _, stdout, _ = ssh.exec_command("df")
-            output = stdout.read().decode("utf-8")
-            splited_output = [
-                i.strip().split() for i in output.split('\n') if len(
-                    i.strip().split()) and "/dev/sd" in i.strip().split()[0]
-                ]
-            disk = sum([int(i[1]) for i in splited_output])
-            used_disk = sum([int(i[2]) for i in splited_output])
-
-            # check cpu status
-            _, stdout, _ = ssh.exec_command("top -b -n1 | grep 'Cpu(s)'")
-            output = stdout.read().decode("utf-8")
-
-            cpu_usage_line = output.strip()
-            cpu_usage_parts = cpu_usage_line.split(',')
-
-            idle_percentage = float(
-                [part.split()[0] for part in cpu_usage_parts if 'id' in part][0]
+            cls.__check_transport(ssh)
+            await cls.run_blocking(
+                functools.partial(cls.__read_blocking, ssh, "true", SSH_HEALTH_TIMEOUT),
+                timeout=SSH_HEALTH_TIMEOUT
             )
-            cpu_usage_percent = 100 - idle_percentage
-
-            return  {
-                "cpu_usage_percentage": float("{:.2f}".format(cpu_usage_percent)),
-                "total_memory_in_KB": memory,
-                "used_memory_in_KB": used_memory,
-                "total_disk_in_KB": disk,
-                "used_disk_in_KB": used_disk
-            }
+        except paramiko.ssh_exception.ChannelException:
+            # server refused one more channel, so it did answer
+            logger.debug("ssh server id: %d is busy, health probe channel refused", id_server)
+        except Exception as e:
+            logger.info("ssh connection of server id: %d failed health probe: %s", id_server, e)
+            metrics.incr("ssh_health_probe_failures")
+            cls.schedule_reconnect(id_server=id_server)
+
+
+    @classmethod
+    async def __reconnect(cls, id_server: int):
+        """
+        replace connection of a server, on failure next attempt is backed off
+        """
+        try:
+            failures, _ = cls.reconnecting.get(id_server, (0, 0.0))
+            await cls.disconnect(channel=id_server, keep_reconnecting=True)
+            ssh = await cls.__connect_once(server=None, id_server=id_server)
+            if ssh is not None and await cls.is_active(ssh=ssh):
+                cls.reconnecting.pop(id_server, None)
+                metrics.incr("ssh_reconnects")
+                logger.info("ssh connection of server id: %d reconnected", id_server)
+                return
+            delay = reconnect_delay(failures=failures)
+            cls.reconnecting[id_server] = (failures + 1, time.monotonic() + delay)
+            metrics.incr("ssh_reconnect_failures")
+            logger.info("reconnecting server id: %d failed, next attempt in %.1fs", id_server, delay)
+        except Exception as e:
+            logger.exception(e)
+        finally:
+            cls.reconnect_tasks.pop(id_server, None)
+
+
+    @classmethod
+    async def get_server_status(
+        cls,
+        ssh: paramiko.SSHClient,
+        retry: int = 1,
+        id_server: int | None = None
+        ):
+        """
+        get system resource balance with a single probe command
+        """
+        try:
+            if id_server is None:
+                for ac in cls.active_connections.items():
+                    if ac[1] == ssh:
+                        id_server = ac[0]
+                        break
+            output = await cls.exec_command(ssh=ssh, command=PROBE_COMMAND)
+            return cls.probe.status(id_server=id_server or 0, output=output)
         except Exception:
             if retry > 0:
-                return await cls.get_server_status(ssh=ssh, retry=retry-1)
+                return await cls.get_server_status(ssh=ssh, retry=retry-1, id_server=id_server)
             return None
 
 
+    @classmethod
+    def start_metrics_stream(cls, id_server: int):
+        """
+        start a long lived metrics stream of a server if it is not running.
+        a sampler loop on the server prints a probe output every `SERVER_METRICS_INTERVAL`
+        seconds over one channel and a reader task on running event loop keeps
+        latest status of the server.
+        """
+        with cls.streams_lock:
+            task = cls.streams.get(id_server)
+            if task is not None and not task.done():
+                return
+            task = asyncio.get_running_loop().create_task(cls.__stream_metrics(id_server))
+            cls.streams[id_server] = task
+        logger.debug("metrics stream of server id: %d started", id_server)
+
+
+    @classmethod
+    def stop_metrics_stream(cls, id_server: int):
+        """
+        stop metrics stream of a server. safe to be called from any thread,
+        its reader task ends once it sees the channel closed
+        """
+        with cls.streams_lock:
+            cls.streams.pop(id_server, None)
+            channel = cls.stream_channels.pop(id_server, None)
+            cls.streamed_status.pop(id_server, None)
+        if channel is not None:
+            channel.close()
+
+
+    @classmethod
+    def get_streamed_status(cls, id_server: int) -> tuple[dict | None, bool]:
+        """
+        latest streamed status of a server.
+        returns (status, stale) where stale means no fresh sample arrived lately
+        """
+        sample = cls.streamed_status.get(id_server)
+        if sample is None:
+            return None, True
+        age = time.monotonic() - sample[0]
+        return sample[1], age > 3 * SERVER_METRICS_INTERVAL
+
+
+    @classmethod
+    async def __stream_metrics(cls, id_server: int):
+        """
+        reader task of a metrics stream. restarts the stream if its channel dies
+        """
+        me = asyncio.current_task()
+        while cls.streams.get(id_server) is me:
+            ssh = cls.active_connections.get(id_server)
+            transport = ssh.get_transport() if ssh else None
+            if ssh is None or transport is None or not transport.is_active():
+                await asyncio.sleep(SERVER_METRICS_INTERVAL)
+                continue
+            try:
+                await cls.__read_metrics_stream(id_server=id_server, ssh=ssh)
+                logger.info("metrics stream of server id: %d ended", id_server)
+            except Exception as e:
+                logger.debug("metrics stream of server id: %d failed: %s", id_server, e)
+            if cls.streams.get(id_server) is me:
+                metrics.incr("metrics_stream_restarts")
+                await asyncio.sleep(SERVER_METRICS_INTERVAL)
+        logger.debug("metrics stream of server id: %d stopped", id_server)
+
+
+    @classmethod
+    async def __read_metrics_stream(cls, id_server: int, ssh: paramiko.SSHClient):
+        """
+        run one metrics stream until its channel ends or goes silent.
+        its channel takes a slot of server's pool for as long as it is open.
+        channel is polled from event loop and only read when data is ready, so no
+        thread is held by the stream
+        """
+        pool = cls.pools.get(ssh)
+        slots = pool.loop_slots() if pool is not None else None
+        if slots is not None:
+            await asyncio.wait_for(slots.acquire(), timeout=SSH_POOL_WAIT_TIMEOUT)
+        client, channel, acquired = ssh, None, False
+        try:
+            if pool is not None:
+                client = await cls.run_blocking(
+                    functools.partial(pool.acquire, timeout=SSH_POOL_WAIT_TIMEOUT),
+                    timeout=2 * SSH_POOL_WAIT_TIMEOUT
+                )
+                acquired = True
+            channel = await cls.run_blocking(
+                functools.partial(cls.__open_stream_blocking, client),
+                timeout=SSH_CONNECT_TIMEOUT + SSH_COMMAND_TIMEOUT
+            )
+            with cls.streams_lock:
+                cls.stream_channels[id_server] = channel
+            # a dead stream is noticed when no line arrives for a while
+            silence = 3 * SERVER_METRICS_INTERVAL + SSH_COMMAND_TIMEOUT
+            poll = min(SERVER_METRICS_INTERVAL / 4, 0.25)
+            last_data = time.monotonic()
+            buffer, lines = "", []
+            while not channel.closed:
+                if not channel.recv_ready():
+                    if channel.exit_status_ready() or time.monotonic() - last_data > silence:
+                        return
+                    await asyncio.sleep(poll)
+                    continue
+                chunk = channel.recv(SSH_STREAM_CHUNK)
+                if not chunk:
+                    return
+                last_data = time.monotonic()
+                buffer += chunk.decode("utf-8", errors="replace")
+                *complete, buffer = buffer.split("\n")
+                for line in complete:
+                    if line.strip() != END_MARK:
+                        lines.append(line + "\n")
+                        continue
+                    status = cls.probe.status(id_server=id_server, output="".join(lines))
+                    cls.streamed_status[id_server] = (time.monotonic(), status)
+                    lines = []
+        finally:
+            if channel is not None:
+                channel.close()
+            if acquired:
+                pool.release(client) # type: ignore
+            if slots is not None:
+                slots.release()
+
+
+    @staticmethod
+    def __open_stream_blocking(client: paramiko.SSHClient) -> paramiko.Channel:
+        """
+        open a channel running metrics sampler loop (blocking)
+        """
+        transport = client.get_transport()
+        if transport is None or not transport.is_active():
+            raise ConnectionError("ssh connection is down")
+        channel = transport.open_session(timeout=SSH_CONNECT_TIMEOUT)
+        channel.exec_command(stream_command(interval=SERVER_METRICS_INTERVAL))
+        return channel
+
+
     @classmethod
     async def get_ssh_client(
         cls,
@@ -169,18 +669,52 @@ class SSHManager(Singleton):
         returns ssh client
         """
         try:
-            if id_server in cls.active_connections:
-                return cls.active_connections[id_server]
-            elif server and server.id_server in cls.active_connections:
-                return cls.active_connections[server.id_server]
-            else:
-                return await cls.__create_new_client(server=server, id_server=id_server)
+            if id_server is None and server is not None:
+                id_server = server.id_server
+            if id_server is None:
+                raise ValueError("Both server and id_server can not be None")
+            with cls.lock:
+                if id_server in cls.active_connections:
+                    return cls.active_connections[id_server]
+                if id_server in cls.reconnecting:
+                    # supervisor owns connecting this server, do not pay connect timeout here
+                    return None
+            return await cls.__connect_once(server=server, id_server=id_server)
         except Exception as e:
             logger.exception(e)
             return None
             # raise Exception(e) from e
 
 
+    @classmethod
+    async def __connect_once(
+        cls,
+        server: Server | None,
+        id_server: int
+    ) -> Optional[paramiko.SSHClient]:
+        """
+        single-flight connect. concurrent callers of a server, from any thread or loop,
+        share one in-flight connect and get the same client (or None if it failed)
+        """
+        with cls.lock:
+            future = cls.connecting.get(id_server)
+            owner = future is None
+            if owner:
+                future = Future()
+                cls.connecting[id_server] = future
+        if not owner:
+            metrics.incr("ssh_connect_shared")
+            return await asyncio.wrap_future(future) # type: ignore
+        ssh = None
+        try:
+            ssh = await cls.__create_new_client(server=server, id_server=id_server)
+        finally:
+            with cls.lock:
+                cls.connecting.pop(id_server, None)
+            future.set_result(ssh) # type: ignore
+        return ssh
+
+
     @classmethod
     async def __create_new_client(
         cls,
@@ -188,46 +722,186 @@ class SSHManager(Singleton):
         id_server: int | None
     ) -> Optional[paramiko.SSHClient]:
         """
-        create new ssh client
+        create new ssh client and register it once it is connected.
+        returns None if connecting fails
         """
         ssh = paramiko.SSHClient()
         try:
             if server is None and id_server is None:
                 raise ValueError("Both server and id_server can not be None")
-            if id_server:
+            if server is None:
                 session = next(get_db())
                 server = session.get(Server, id_server)
             if server is None:
                 raise ValueError("server does not exist")
-            await cls.__connect(ssh=ssh, channel=server.id_server) # type: ignore
             ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            if server.password:
-                ssh.connect(
-                    hostname=server.ip,
-                    port=server.port,
-                    username=server.username,
-                    password=server.password
-                )
-                return ssh
-            elif server.keyfilename:
-                k = paramiko.RSAKey.from_private_key_file(server.keyfilename)
-                ssh.connect(
-                    hostname=server.ip,
-                    port=server.port,
-                    username=server.username,
-                    pkey=k
-                )
-                return ssh
-            else:
-                raise ValueError("Both `Password` and `keyfile` can not be None")
+            await cls.run_blocking(
+                functools.partial(cls.__connect_blocking, ssh, server),
+                # key loading and connect each have their own timeout
+                timeout=2 * SSH_CONNECT_TIMEOUT
+            )
+            pool = SSHPool(
+                id_server=server.id_server, # type: ignore
+                primary=ssh,
+                connect=functools.partial(cls.__open_client, server),
+                min_transports=SSH_POOL_MIN_TRANSPORTS,
+                max_transports=SSH_POOL_MAX_TRANSPORTS,
+                max_channels=SSH_POOL_MAX_CHANNELS
+            )
+            with cls.lock:
+                cls.pools[ssh] = pool
+            await cls.__connect(ssh=ssh, channel=server.id_server) # type: ignore
+            cls.executor.submit(pool.fill)
+            return ssh
 
         except paramiko.ssh_exception.NoValidConnectionsError as e:
             logger.debug("ssh connection error. id_server: %d", server.id_server) # type: ignore
             logger.exception(e)
-            return ssh
         except Exception as e:
             logger.exception(e)
-            return ssh
+        ssh.close()
+        if server is not None and server.id_server is not None:
+            cls.schedule_reconnect(id_server=server.id_server)
+        return None
+
+
+    @staticmethod
+    def __connect_blocking(ssh: paramiko.SSHClient, server: Server):
+        """
+        connect a ssh client to server with its password or key file (blocking)
+        """
+        if server.password:
+            credentials = {"password": server.password}
+        elif server.keyfilename:
+            credentials = {"pkey": paramiko.RSAKey.from_private_key_file(server.keyfilename)}
+        else:
+            raise ValueError("Both `Password` and `keyfile` can not be None")
+        ssh.connect(
+            hostname=server.ip,
+            port=server.port,
+            username=server.username,
+            timeout=SSH_CONNECT_TIMEOUT,
+            banner_timeout=SSH_CONNECT_TIMEOUT,
+            auth_timeout=SSH_CONNECT_TIMEOUT,
+            **credentials
+        )
+        ssh.get_transport().set_keepalive(SSH_KEEPALIVE_INTERVAL) # type: ignore
+
+
+    @classmethod
+    def __open_client(cls, server: Server) -> paramiko.SSHClient:
+        """
+        open another connected ssh client to server (blocking), used to grow transport pools
+        """
+        ssh = paramiko.SSHClient()
+        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            cls.__connect_blocking(ssh, server)
+        except Exception:
+            ssh.close()
+            raise
+        return ssh
+
+
+class WebSocketClient:
+    """
+    bounded outbound queue and writer task of a websocket.
+    messages with the same key replace each other while waiting in queue,
+    and the websocket is evicted when queue overflows or a send stays blocked
+    longer than `WS_SEND_TIMEOUT` seconds.
+    """
+    def __init__(self, websocket: WebSocket, on_evict: Callable[[WebSocket], Any]):
+        self.websocket = websocket
+        self.on_evict = on_evict
+        self.loop = asyncio.get_running_loop()
+        self.pending: OrderedDict[Any, str] = OrderedDict()
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.writer = self.loop.create_task(self.__write())
+
+
+    def send(self, payload: str, key: Any = None):
+        """
+        queue a message to be sent. safe to be called from any thread
+        """
+        if self.closed or self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.__enqueue, payload, key)
+
+
+    def close(self):
+        """
+        stop writer task and drop pending messages
+        """
+        self.closed = True
+        self.pending.clear()
+        if not self.writer.done():
+            self.writer.cancel()
+
+
+    def __enqueue(self, payload: str, key: Any):
+        """
+        put a message in queue (runs on websocket event loop)
+        """
+        if self.closed:
+            return
+        if key is not None and key in self.pending:
+            self.pending[key] = payload
+            metrics.incr("ws_coalesced_messages")
+            return
+        if len(self.pending) >= WS_SEND_QUEUE_SIZE:
+            self.__evict(reason="overflow")
+            return
+        self.pending[key if key is not None else object()] = payload
+        self.ready.set()
+
+
+    def __evict(self, reason: str):
+        """
+        drop a slow websocket
+        """
+        logger.warning("slow websocket evicted (%s)", reason)
+        metrics.incr(f"ws_evicted_{reason}")
+        self.close()
+        self.on_evict(self.websocket)
+        self.loop.create_task(self.__close_websocket())
+
+
+    async def __close_websocket(self):
+        """
+        close evicted websocket
+        """
+        try:
+            await asyncio.wait_for(
+                self.websocket.close(code=1008, reason="slow consumer"),
+                timeout=WS_SEND_TIMEOUT
+            )
+        except Exception as e:
+            logger.debug("closing evicted websocket failed: %s", e)
+
+
+    async def __write(self):
+        """
+        send queued messages one by one
+        """
+        while not self.closed:
+            await self.ready.wait()
+            self.ready.clear()
+            while self.pending and not self.closed:
+                _, payload = self.pending.popitem(last=False)
+                try:
+                    await asyncio.wait_for(
+                        self.websocket.send_text(payload),
+                        timeout=WS_SEND_TIMEOUT
+                    )
+                except TimeoutError:
+                    self.__evict(reason="timeout")
+                    return
+                except Exception as e:
+                    logger.debug("sending to websocket failed: %s", e)
+                    self.close()
+                    self.on_evict(self.websocket)
+                    return
 
 
 class ServiceConnectionManager(Singleton):
@@ -239,6 +913,7 @@ class ServiceConnectionManager(Singleton):
     def __init__(cls):
         try:
             cls.active_connections: dict[int, list[WebSocket]] = {}
+            cls.clients: dict[WebSocket, WebSocketClient] = {}
             logger.debug("Service Connection Manager initialized")
         except Exception as e:
             logger.exception(e)
@@ -251,6 +926,7 @@ class ServiceConnectionManager(Singleton):
         """
         try:
             await websocket.accept()
+            cls.clients[websocket] = WebSocketClient(websocket=websocket, on_evict=cls.disconnect)
             if channel in cls.active_connections:
                 cls.active_connections[channel].append(websocket)
                 logger.debug("new Service websocket subscribed to channel :%d", channel)
@@ -267,6 +943,9 @@ class ServiceConnectionManager(Singleton):
         disconnect a websocket and remove from manager
         """
         try:
+            client = cls.clients.pop(websocket, None)
+            if client:
+                client.close()
             for ch in cls.active_connections.items():
                 if websocket in cls.active_connections[ch[0]]:
                     cls.active_connections[ch[0]].remove(websocket)
@@ -305,41 +984,62 @@ class ServiceConnectionManager(Singleton):
         send a message to a websocket
         """
         try:
-            await websocket.send_text(message)
+            client = cls.clients.get(websocket)
+            if client:
+                client.send(payload=message)
             logger.debug("message: %s , sent to Service ws", message)
         except Exception as e:
             logger.exception(e)
 
 
     @classmethod
-    async def auto_broadcast(cls, msg: dict):
+    async def auto_broadcast(cls, msg: dict, key: Any = None):
         """
         gives dict which keys are channel ids and values are messages
         and broadcast each message to its channel.
         """
         try:
             for i in msg.items():
-                await cls.broadcast(message=i[1], channel=i[0])
+                await cls.broadcast(message=i[1], channel=i[0], key=key)
         except Exception as e:
             logger.exception(e)
 
 
     @classmethod
-    async def broadcast(cls, message: dict, channel: int):
+    async def broadcast(cls, message: dict | list, channel: int, key: Any = None):
         """
-        send a message to all existing websockets
+        queue a message for all existing websockets of a channel.
+        a queued message with the same `key` is replaced by the new one.
         """
         try:
-            if channel in cls.active_connections:
-                for connection in cls.active_connections[channel]:
-                    await connection.send_json(message)
-                    # logger.debug(
-                    #     "message: %s , broadcasted to Service channel %d",
-                    #     message,
-                    #     channel
-                    # )
-            # else:
-            #     logger.debug("Service connection channel %s does not exist...", channel)
+            connections = list(cls.active_connections.get(channel, []))
+            if connections:
+                payload = encode(message)
+                for connection in connections:
+                    client = cls.clients.get(connection)
+                    if client:
+                        client.send(payload=payload, key=key)
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    async def broadcast_many(cls, message: dict | list, channels: list[int], key: Any = None):
+        """
+        queue the same message for all existing websockets of many channels,
+        encoding it only once
+        """
+        try:
+            connections = [
+                connection for channel in channels
+                for connection in cls.active_connections.get(channel, [])
+            ]
+            if connections:
+                payload = encode(message)
+                for connection in connections:
+                    client = cls.clients.get(connection)
+                    if client:
+                        client.send(payload=payload, key=key)
         except Exception as e:
             logger.exception(e)
 
@@ -352,6 +1052,7 @@ class ServerConnectionManager(Singleton):
     def __init__(cls):
         try:
             cls.active_connections: list[WebSocket] = []
+            cls.clients: dict[WebSocket, WebSocketClient] = {}
             logger.debug("Server Connection Manager initialized")
         except Exception as e:
             logger.exception(e)
@@ -364,6 +1065,7 @@ class ServerConnectionManager(Singleton):
         """
         try:
             await websocket.accept()
+            cls.clients[websocket] = WebSocketClient(websocket=websocket, on_evict=cls.disconnect)
             cls.active_connections.append(websocket)
             logger.debug("new Server websocket subscribed.")
         except Exception as e:
@@ -376,8 +1078,12 @@ class ServerConnectionManager(Singleton):
         disconnect a Server websocket and remove from manager
         """
         try:
-            cls.active_connections.remove(websocket)
-            logger.debug("Server websocket unsubscribed")
+            client = cls.clients.pop(websocket, None)
+            if client:
+                client.close()
+            if websocket in cls.active_connections:
+                cls.active_connections.remove(websocket)
+                logger.debug("Server websocket unsubscribed")
         except Exception as e:
             logger.exception(e)
 
@@ -388,7 +1094,9 @@ class ServerConnectionManager(Singleton):
         send a message to a Server websocket
         """
         try:
-            await websocket.send_text(message)
+            client = cls.clients.get(websocket)
+            if client:
+                client.send(payload=message)
             logger.debug("message: %s , sent to Server ws", message)
         except Exception as e:
             logger.exception(e)
@@ -397,12 +1105,18 @@ class ServerConnectionManager(Singleton):
     @classmethod
     async def broadcast(cls, message: dict):
         """
-        send a message to all existing Server websockets
+        queue a message for all existing Server websockets.
+        as each message carries whole board, a newer one replaces an unsent one.
         """
         try:
-            for connection in cls.active_connections:
-                await connection.send_json(message)
-            # logger.debug("message: %s , broadcasted")
+            connections = list(cls.active_connections)
+            if not connections:
+                return
+            payload = encode(message)
+            for connection in connections:
+                client = cls.clients.get(connection)
+                if client:
+                    client.send(payload=payload, key="server_load")
         except Exception as e:
             logger.exception(e)
 
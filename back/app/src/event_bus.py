@@ -0,0 +1,76 @@
+"""
+Internal async event bus to publish events (like new beats) between event loops
+"""
+import asyncio
+import threading
+from typing import Any
+
+from app.core.logging import get_configed_logging
+from app.src.connection_manager import Singleton
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+
+
+class EventBus(Singleton):
+    """
+    Singleton based publish/subscribe bus.
+    each subscriber gets its own queue on its own event loop and publishers
+    may run on any thread.
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            cls.subscribers: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+            cls.lock = threading.Lock()
+            logger.debug("Event Bus initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def subscribe(cls, topic: str, maxsize: int = 10000) -> asyncio.Queue:
+        """
+        subscribe to a topic. must be called from the event loop which consumes the queue
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        with cls.lock:
+            cls.subscribers.setdefault(topic, []).append((asyncio.get_running_loop(), queue))
+        logger.debug("new subscriber for topic: %s", topic)
+        return queue
+
+
+    @classmethod
+    def unsubscribe(cls, topic: str, queue: asyncio.Queue):
+        """
+        remove a subscriber queue from a topic
+        """
+        with cls.lock:
+            cls.subscribers[topic] = [
+                i for i in cls.subscribers.get(topic, []) if i[1] is not queue
+            ]
+
+
+    @classmethod
+    def publish(cls, topic: str, event: Any):
+        """
+        publish an event to all subscribers of a topic. safe to be called from any thread
+        """
+        with cls.lock:
+            subscribers = list(cls.subscribers.get(topic, []))
+        for loop, queue in subscribers:
+            if loop.is_closed():
+                cls.unsubscribe(topic=topic, queue=queue)
+                continue
+            loop.call_soon_threadsafe(cls.__deliver, topic, queue, event)
+
+
+    @staticmethod
+    def __deliver(topic: str, queue: asyncio.Queue, event: Any):
+        """
+        put event in subscriber queue (runs on subscriber event loop)
+        """
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("subscriber queue of topic %s is full, event dropped", topic)
@@ -0,0 +1,55 @@
+"""
+Shared async http client of direct online checks
+"""
+import asyncio
+import importlib.util
+import os
+
+import httpx
+from dotenv import load_dotenv
+
+from app.core.logging import get_configed_logging
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+load_dotenv()
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+# http/2 needs optional `h2` package (httpx[http2])
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# httpx clients are bound to the event loop they are used on
+_clients: dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    keep-alive pooled http client of running event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            http2=HTTP2,
+            timeout=HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            follow_redirects=False
+        )
+        _clients[loop] = client
+        logger.debug("http client created (http2: %s)", HTTP2)
+    return client
+
+
+async def close_client():
+    """
+    close http client of running event loop
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,55 @@
+"""
+Match predicates of service checks built from config operators
+"""
+import functools
+import re
+from typing import Callable
+
+from app.models.config import JournalOperatorEnaum, OnlineOperatorEnaum
+
+PREDICATE_CACHE_SIZE = 1024
+
+Predicate = Callable[[str | bytes | bytearray], bool]
+
+
+@functools.lru_cache(maxsize=PREDICATE_CACHE_SIZE)
+def compile_predicate(operator: str, desired: str) -> Predicate:
+    """
+    predicate which tells if a check output matches desired response with an operator,
+    e.g. `desired in output`. outputs may be str or bytes (or bytearray) and are never copied.
+    predicates are cached by (operator, desired), so a config is compiled once
+    and a changed config gets a new predicate.
+    """
+    text = desired
+    raw = desired.encode("utf-8")
+
+    def pick(operand: str | bytes | bytearray):
+        return raw if isinstance(operand, (bytes, bytearray)) else text
+
+    match operator:
+        case OnlineOperatorEnaum.IN.value:
+            return lambda operand: pick(operand) in operand # type: ignore
+        case OnlineOperatorEnaum.NOTIN.value:
+            return lambda operand: pick(operand) not in operand # type: ignore
+        case OnlineOperatorEnaum.EQ.value:
+            return lambda operand: operand == pick(operand)
+        case OnlineOperatorEnaum.NE.value:
+            return lambda operand: operand != pick(operand)
+        case OnlineOperatorEnaum.REGEX.value:
+            try:
+                text_pattern = re.compile(text)
+                raw_pattern = re.compile(raw)
+            except re.error as e:
+                raise ValueError(f"invalid regex {desired!r}: {e}") from e
+            return lambda operand: (
+                raw_pattern if isinstance(operand, (bytes, bytearray)) else text_pattern
+            ).search(operand) is not None # type: ignore
+    raise ValueError(f"unknown operator {operator!r}")
+
+
+def validate_predicate(operator: OnlineOperatorEnaum | JournalOperatorEnaum | None, desired: str | None):
+    """
+    raise ValueError if operator and desired response of a config can not be compiled
+    """
+    if operator is not None and desired is not None:
+        compile_predicate(operator.value, desired)
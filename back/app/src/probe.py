@@ -0,0 +1,149 @@
+"""
+Server resource probe.
+one remote command reads /proc/stat, /proc/meminfo and mounted disks usage,
+and its output is parsed here into server status.
+"""
+import threading
+from typing import NamedTuple
+
+SECTION_MARK = "### "
+
+PROBE_COMMAND = (
+    f"echo '{SECTION_MARK}stat'; head -n1 /proc/stat; "
+    f"echo '{SECTION_MARK}meminfo'; cat /proc/meminfo; "
+    f"echo '{SECTION_MARK}df'; df -kP 2>/dev/null"
+)
+END_MARK = f"{SECTION_MARK}end"
+
+
+def stream_command(interval: float) -> str:
+    """
+    remote sampler loop which prints a probe output followed by `END_MARK`
+    every `interval` seconds
+    """
+    return f"while :; do {PROBE_COMMAND}; echo '{END_MARK}'; sleep {interval:g}; done"
+
+
+class CpuTimes(NamedTuple):
+    """
+    aggregated cpu jiffies from /proc/stat
+    """
+    total: int
+    idle: int
+
+
+def parse_sections(output: str) -> dict[str, list[str]]:
+    """
+    split probe output into its sections
+    """
+    sections: dict[str, list[str]] = {}
+    lines: list[str] = []
+    for line in output.splitlines():
+        if line.startswith(SECTION_MARK):
+            lines = sections.setdefault(line[len(SECTION_MARK):].strip(), [])
+        elif line.strip():
+            lines.append(line.strip())
+    return sections
+
+
+def parse_cpu(lines: list[str]) -> CpuTimes:
+    """
+    parse aggregated `cpu` line of /proc/stat
+    """
+    for line in lines:
+        fields = line.split()
+        if fields and fields[0] == "cpu":
+            # user nice system idle iowait irq softirq steal (guest is part of user)
+            values = [int(i) for i in fields[1:9]]
+            idle = values[3] + (values[4] if len(values) > 4 else 0)
+            return CpuTimes(total=sum(values), idle=idle)
+    raise ValueError("cpu line not found in /proc/stat")
+
+
+def parse_meminfo(lines: list[str]) -> tuple[int, int]:
+    """
+    parse /proc/meminfo.
+    returns (total memory, used memory) in KB
+    """
+    info: dict[str, int] = {}
+    for line in lines:
+        key, _, value = line.partition(":")
+        fields = value.split()
+        if fields:
+            info[key.strip()] = int(fields[0])
+    total = info["MemTotal"]
+    if "MemAvailable" in info:
+        available = info["MemAvailable"]
+    else:
+        available = info.get("MemFree", 0) + info.get("Buffers", 0) + info.get("Cached", 0)
+    return total, total - available
+
+
+def parse_df(lines: list[str]) -> tuple[int, int]:
+    """
+    parse `df -kP` output of block device filesystems, counting each device once.
+    returns (total disk, used disk) in KB
+    """
+    total, used = 0, 0
+    devices = set()
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 6 or not fields[0].startswith("/dev/"):
+            continue
+        if fields[0].startswith("/dev/loop") or fields[0] in devices:
+            continue
+        devices.add(fields[0])
+        total += int(fields[1])
+        used += int(fields[2])
+    return total, used
+
+
+def cpu_usage(previous: CpuTimes | None, current: CpuTimes) -> float:
+    """
+    cpu usage percentage between two samples (or since boot without previous sample)
+    """
+    if previous is None or current.total <= previous.total:
+        previous = CpuTimes(total=0, idle=0)
+    total = current.total - previous.total
+    idle = current.idle - previous.idle
+    if total <= 0:
+        return 0.0
+    return round(100 * (total - idle) / total, 2)
+
+
+class ServerProbe:
+    """
+    turns probe outputs of servers into status, keeping previous cpu sample
+    of each server to compute cpu usage from deltas
+    """
+    def __init__(self):
+        self.cpu_samples: dict[int, CpuTimes] = {}
+        self.lock = threading.Lock()
+
+
+    def status(self, id_server: int, output: str) -> dict:
+        """
+        parse probe output of a server into its status
+        """
+        sections = parse_sections(output)
+        cpu = parse_cpu(sections.get("stat", []))
+        memory, used_memory = parse_meminfo(sections.get("meminfo", []))
+        disk, used_disk = parse_df(sections.get("df", []))
+        with self.lock:
+            previous = self.cpu_samples.get(id_server)
+            self.cpu_samples[id_server] = cpu
+        return {
+            "cpu_usage_percentage": cpu_usage(previous=previous, current=cpu),
+            "total_memory_in_KB": memory,
+            "used_memory_in_KB": used_memory,
+            "total_disk_in_KB": disk,
+            "used_disk_in_KB": used_disk
+        }
+
+
+    def forget(self, id_server: int):
+        """
+        drop previous sample of a server
+        """
+        with self.lock:
+            self.cpu_samples.pop(id_server, None)
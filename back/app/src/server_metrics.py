@@ -0,0 +1,131 @@
+"""
+Time-series history of server load with rollups and retention per tier
+"""
+import asyncio
+import os
+import time
+
+from dotenv import load_dotenv
+
+from app import crud
+from app.api.deps import get_db
+from app.core.logging import get_configed_logging
+from app.models import ServerMetricCreate
+from app.src.connection_manager import Singleton
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+load_dotenv()
+SERVER_METRICS_RAW_INTERVAL = float(os.getenv("SERVER_METRICS_RAW_INTERVAL", "10"))
+SERVER_METRICS_MAX_POINTS = int(os.getenv("SERVER_METRICS_MAX_POINTS", "1000"))
+SERVER_METRICS_ROLLUP_INTERVAL = 60
+# (resolution in seconds, retention in seconds), raw samples have resolution 0
+SERVER_METRICS_TIERS = (
+    (0, float(os.getenv("SERVER_METRICS_RAW_RETENTION", str(24 * 3600)))),
+    (60, float(os.getenv("SERVER_METRICS_MINUTE_RETENTION", str(30 * 24 * 3600)))),
+    (3600, float(os.getenv("SERVER_METRICS_HOUR_RETENTION", str(365 * 24 * 3600)))),
+)
+
+
+def pick_resolution(start: float, end: float, now: float) -> int:
+    """
+    finest resolution which still holds `start` and returns at most
+    `SERVER_METRICS_MAX_POINTS` points for the range
+    """
+    for resolution, retention in SERVER_METRICS_TIERS:
+        step = resolution or SERVER_METRICS_RAW_INTERVAL
+        if start >= now - retention and (end - start) / step <= SERVER_METRICS_MAX_POINTS:
+            return resolution
+    return SERVER_METRICS_TIERS[-1][0]
+
+
+class ServerMetricStore(Singleton):
+    """
+    Singleton based recorder of server load.
+    a raw sample of each server is kept every `SERVER_METRICS_RAW_INTERVAL` seconds,
+    rolled up into 1 minute and 1 hour buckets and dropped after retention of its tier.
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            cls.buffer: list[ServerMetricCreate] = []
+            cls.last_sample: dict[int, float] = {}
+            cls.last_maintenance = 0.0
+            logger.debug("Server Metric Store initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def add(cls, id_server: int, status: dict | None, timestamp: float):
+        """
+        keep a raw sample of server status if one is due
+        """
+        if not status:
+            return
+        if timestamp - cls.last_sample.get(id_server, 0) < SERVER_METRICS_RAW_INTERVAL:
+            return
+        cls.last_sample[id_server] = timestamp
+        cls.buffer.append(ServerMetricCreate(
+            id_server=id_server,
+            resolution=0,
+            timestamp=timestamp,
+            cpu_usage_percentage=status.get("cpu_usage_percentage"),
+            max_cpu_usage_percentage=status.get("cpu_usage_percentage"),
+            total_memory_in_KB=status.get("total_memory_in_KB"),
+            used_memory_in_KB=status.get("used_memory_in_KB"),
+            total_disk_in_KB=status.get("total_disk_in_KB"),
+            used_disk_in_KB=status.get("used_disk_in_KB")
+        ))
+
+
+    @classmethod
+    async def flush(cls):
+        """
+        store pending samples and run rollups and retention when due
+        """
+        batch, cls.buffer = cls.buffer, []
+        if batch:
+            await asyncio.to_thread(cls.__write, batch)
+        if time.monotonic() - cls.last_maintenance >= SERVER_METRICS_ROLLUP_INTERVAL:
+            cls.last_maintenance = time.monotonic()
+            await asyncio.to_thread(cls.maintain, time.time())
+
+
+    @staticmethod
+    def __write(batch: list[ServerMetricCreate]):
+        """
+        store a batch of raw samples
+        """
+        try:
+            with next(get_db()) as session:
+                crud.server_metric.create_server_metrics(session=session, metrics=batch)
+        except Exception as e:
+            logger.exception(e)
+            logger.error("%d server metrics dropped", len(batch))
+
+
+    @staticmethod
+    def maintain(now: float):
+        """
+        roll up finished buckets into coarser tiers and apply retention of every tier
+        """
+        try:
+            with next(get_db()) as session:
+                for (source, _), (resolution, _) in zip(SERVER_METRICS_TIERS, SERVER_METRICS_TIERS[1:]):
+                    # leave room for samples of a bucket which are not rolled up yet
+                    lag = source or SERVER_METRICS_RAW_INTERVAL
+                    crud.server_metric.rollup_server_metrics(
+                        session=session,
+                        source=source,
+                        resolution=resolution,
+                        until=now - lag
+                    )
+                for resolution, retention in SERVER_METRICS_TIERS:
+                    crud.server_metric.delete_server_metrics_before(
+                        session=session,
+                        resolution=resolution,
+                        before=now - retention
+                    )
+        except Exception as e:
+            logger.exception(e)
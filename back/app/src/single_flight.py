@@ -0,0 +1,64 @@
+"""
+Single-flight coalescing of identical async calls
+"""
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+from app.core import metrics
+
+
+class SingleFlight:
+    """
+    runs one call per key at a time. callers asking for the same key while it runs,
+    or within `window` seconds after it finished, get its result instead of calling again.
+    calls run as their own tasks, so a cancelled caller does not cancel the shared call.
+    tasks are bound to an event loop, so calls are only shared on the same loop.
+    """
+    def __init__(self, name: str, window: float):
+        self.name = name
+        self.window = window
+        self.calls: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        # results of finished calls: (monotonic time finished, result)
+        self.results: dict[tuple[asyncio.AbstractEventLoop, Hashable], tuple[float, Any]] = {}
+
+
+    async def do(
+            self,
+            key: Hashable,
+            func: Callable[[], Awaitable[Any]],
+            window: float | None = None
+        ) -> Any:
+        """
+        result of `func` for `key`, shared with identical calls.
+        `window` overrides how old a finished result may be to be reused
+        """
+        loop = asyncio.get_running_loop()
+        slot = (loop, key)
+        window = self.window if window is None else min(window, self.window)
+        recent = self.results.get(slot)
+        if recent is not None and time.monotonic() - recent[0] <= window:
+            metrics.incr(f"{self.name}_coalesced")
+            return recent[1]
+        task = self.calls.get(slot)
+        if task is not None:
+            metrics.incr(f"{self.name}_coalesced")
+            return await asyncio.shield(task)
+        task = loop.create_task(self.__run(slot=slot, func=func))
+        self.calls[slot] = task
+        return await asyncio.shield(task)
+
+
+    async def __run(self, slot: tuple[asyncio.AbstractEventLoop, Hashable], func: Callable[[], Awaitable[Any]]):
+        """
+        run a shared call and keep its result for later callers
+        """
+        try:
+            result = await func()
+            now = time.monotonic()
+            for expired in [s for s, (at, _) in self.results.items() if now - at > self.window]:
+                self.results.pop(expired)
+            self.results[slot] = (now, result)
+            return result
+        finally:
+            self.calls.pop(slot, None)
@@ -0,0 +1,199 @@
+"""
+Pool of SSH transports of a server with a channel limit per transport
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+import paramiko
+
+from app.core import metrics
+from app.core.logging import get_configed_logging
+
+logging = get_configed_logging()
+logger = logging.getLogger(__name__)
+# do not try to open another transport for a while after a failed attempt
+GROW_BACKOFF = 10.0
+
+
+class PoolWaitTimeout(TimeoutError):
+    """
+    no channel of a server became free in time. the server itself may be healthy
+    """
+
+
+class SSHPool:
+    """
+    transports of a server. the primary client is the one registered in SSHManager,
+    more transports are opened on demand up to `max_transports`.
+    each transport carries at most `max_channels` concurrent channels and exec requests
+    wait in FIFO order for a free channel.
+    all methods are blocking and are meant to be called from ssh executor threads.
+    callers on an event loop wait for a slot with `loop_slots` first, so executor
+    threads are not held by requests which have to wait for a channel.
+    """
+    def __init__(
+            self,
+            id_server: int,
+            primary: paramiko.SSHClient,
+            connect: Callable[[], paramiko.SSHClient],
+            min_transports: int,
+            max_transports: int,
+            max_channels: int
+        ):
+        self.id_server = id_server
+        self.primary = primary
+        self.connect = connect
+        self.min_transports = max(min_transports, 1)
+        self.max_transports = max(max_transports, self.min_transports)
+        self.max_channels = max(max_channels, 1)
+        self.clients: list[paramiko.SSHClient] = [primary]
+        self.in_use: dict[paramiko.SSHClient, int] = {primary: 0}
+        self.waiters: deque[object] = deque()
+        self.opening = 0
+        self.grow_failed_at = -GROW_BACKOFF
+        self.closed = False
+        self.condition = threading.Condition()
+        self.slots: dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+
+    def loop_slots(self) -> asyncio.Semaphore:
+        """
+        semaphore of running event loop with one slot per channel of a full pool
+        """
+        loop = asyncio.get_running_loop()
+        slots = self.slots.get(loop)
+        if slots is None:
+            slots = self.slots.setdefault(
+                loop, asyncio.Semaphore(self.max_transports * self.max_channels)
+            )
+        return slots
+
+
+    def fill(self):
+        """
+        open transports until pool has `min_transports`
+        """
+        while True:
+            with self.condition:
+                if self.closed or len(self.clients) + self.opening >= self.min_transports:
+                    return
+                self.opening += 1
+            if self.__grow() is None:
+                return
+            with self.condition:
+                self.condition.notify_all()
+
+
+    def acquire(self, timeout: float) -> paramiko.SSHClient:
+        """
+        take a channel slot on one of transports. waits at most `timeout` seconds
+        """
+        deadline = time.monotonic() + timeout
+        ticket = object()
+        waited = False
+        with self.condition:
+            self.waiters.append(ticket)
+            try:
+                while True:
+                    if self.closed:
+                        raise RuntimeError("ssh pool is closed")
+                    if self.waiters[0] is ticket:
+                        client = self.__free_client()
+                        if client is not None:
+                            self.in_use[client] += 1
+                            return client
+                        if self.__can_grow():
+                            self.opening += 1
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        metrics.incr("ssh_pool_wait_timeouts")
+                        raise PoolWaitTimeout(f"no free ssh channel on server id: {self.id_server}")
+                    if not waited:
+                        waited = True
+                        metrics.incr("ssh_pool_waits")
+                    self.condition.wait(remaining)
+            finally:
+                self.waiters.remove(ticket)
+                self.condition.notify_all()
+        client = self.__grow(in_use=1)
+        if client is None:
+            return self.acquire(timeout=max(deadline - time.monotonic(), 0))
+        return client
+
+
+    def release(self, client: paramiko.SSHClient):
+        """
+        give back a channel slot
+        """
+        with self.condition:
+            if client in self.in_use:
+                self.in_use[client] -= 1
+            self.condition.notify_all()
+
+
+    def close(self):
+        """
+        close transports opened by pool. primary client is owned by SSHManager
+        """
+        with self.condition:
+            self.closed = True
+            extras = self.clients[1:]
+            self.clients = [self.primary]
+            self.condition.notify_all()
+        for client in extras:
+            client.close()
+
+
+    def __free_client(self) -> paramiko.SSHClient | None:
+        """
+        least busy live transport with a free channel slot (condition must be held)
+        """
+        for client in self.clients[1:]:
+            transport = client.get_transport()
+            if (transport is None or not transport.is_active()) and not self.in_use[client]:
+                logger.debug("dropping dead pooled transport of server id: %d", self.id_server)
+                self.clients.remove(client)
+                self.in_use.pop(client)
+                client.close()
+        candidates = [c for c in self.clients if self.in_use[c] < self.max_channels]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: self.in_use[c])
+
+
+    def __can_grow(self) -> bool:
+        """
+        whether another transport may be opened (condition must be held)
+        """
+        return (
+            len(self.clients) + self.opening < self.max_transports
+            and time.monotonic() - self.grow_failed_at >= GROW_BACKOFF
+        )
+
+
+    def __grow(self, in_use: int = 0) -> paramiko.SSHClient | None:
+        """
+        open one more transport (a slot in `opening` must be reserved by caller)
+        """
+        client = None
+        try:
+            client = self.connect()
+        except Exception as e:
+            logger.info("could not open another transport to server id: %d: %s", self.id_server, e)
+        with self.condition:
+            self.opening -= 1
+            if client is None:
+                self.grow_failed_at = time.monotonic()
+            elif self.closed:
+                client.close()
+                client = None
+            else:
+                self.clients.append(client)
+                self.in_use[client] = in_use
+                metrics.incr("ssh_pool_transports_opened")
+            self.condition.notify_all()
+        return client
@@ -3,34 +3,98 @@ modulefor repetetive tasks like checking service status and sending results
 """
 import asyncio
 import datetime
+import heapq
+import itertools
+import math
 import os
+import random
+import threading
+import time
+import zlib
+from collections import deque
 
 from dotenv import load_dotenv
-from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session
 
 from app import crud
 from app.api.deps import get_db
+from app.core import metrics
 from app.core.logging import get_configed_logging
-from app.models import BeatCreate, Service, ServiceTypeEnum, ServiceWithBeats
-from app.src import checker
+from app.models import BeatCreate, Service, ServiceTypeEnum
+from app.src import checker, http_client
+from app.src.beat_cache import MAX_CHART_BARS, BeatCache, serialize_beat
+from app.src.beat_writer import BeatWriter
+from app.src.event_bus import EventBus
+from app.src.connection_manager import WS_SEND_QUEUE_SIZE, Singleton
+from app.src.server_metrics import SERVER_METRICS_RAW_INTERVAL, ServerMetricStore
 
 logging = get_configed_logging()
 logger = logging.getLogger(__name__)
 load_dotenv()
-MAX_CHART_BARS = int(os.getenv("MAX_CHART_BARS", "50"))
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "32"))
+SYSTEMD_BATCH_WINDOW = float(os.getenv("SYSTEMD_BATCH_WINDOW", "2"))
+# bounded random delay added to every tick, as a fraction of service interval
+SCHEDULER_JITTER = min(max(float(os.getenv("SCHEDULER_JITTER", "0")), 0), 0.5)
+# what to do when a check overran its next tick: skip missed ticks, run once
+# immediately or back off to a longer interval while the service keeps overrunning
+OVERRUN_POLICIES = ("skip", "immediate", "backoff")
+SCHEDULER_OVERRUN_POLICY = os.getenv("SCHEDULER_OVERRUN_POLICY", "skip").lower()
+SCHEDULER_MAX_BACKOFF = 8
+DEFAULT_RETRY_INTERVAL = 60.0
+BEAT_TOPIC = "beat"
+LIVE_BOARD_HISTORY = int(os.getenv("LIVE_BOARD_HISTORY", "10000"))
+# most missed deltas replayed to a resuming client, a bigger gap gets a snapshot.
+# kept well below client send queue, so a replay never gets the client evicted
+LIVE_BOARD_MAX_RESUME = int(os.getenv("LIVE_BOARD_MAX_RESUME", str(WS_SEND_QUEUE_SIZE // 2)))
+SERVER_LOAD_INTERVAL = float(os.getenv("SERVER_LOAD_INTERVAL", "1"))
+SERVER_LOAD_CONCURRENCY = int(os.getenv("SERVER_LOAD_CONCURRENCY", "32"))
+SERVER_LOAD_TIMEOUT = float(os.getenv("SERVER_LOAD_TIMEOUT", "3"))
 
 
-async def run_beater(id_service: int):
+async def store_beat(beat: BeatCreate, service: Service):
     """
-    run a beater for given service based on service config
+    publish a new beat to recent beats cache and event bus
+    and queue it to be stored in database
     """
-    while True:
-        ts = datetime.datetime.now(datetime.UTC)
-        session = next(get_db())
+    BeatCache().add(beat)
+    EventBus().publish(
+        topic=BEAT_TOPIC,
+        event={**service_info(service=service), "beat": serialize_beat(beat=beat)}
+    )
+    await BeatWriter().put(beat)
+
+
+def service_info(service: Service) -> dict:
+    """
+    serialize service fields which are shown on live board
+    """
+    return {
+        "service_type": service.service_type.value,
+        "id_service": service.id_service,
+        "service_name": service.service_name,
+        "id_server": service.id_server
+    }
+
+
+def service_with_beats(info: dict) -> dict:
+    """
+    serialize a service (like `ServiceWithBeats`) with its recent beats from beats cache
+    """
+    return {**info, "beats": BeatCache().get(info["id_service"])}
+
+
+async def run_beater(id_service: int) -> float | None:
+    """
+    run a single check for given service based on service config and queue its beat.
+    returns check interval of the service or `None` if service does not exist anymore
+    """
+    ts = datetime.datetime.now(datetime.UTC)
+    session = next(get_db())
+    try:
         service = session.get(Service, id_service)
         if not service:
             logger.warning("service with id %d not found!", id_service)
-            return
+            return None
         match service.service_type:
             case ServiceTypeEnum.ONLINE:
                 res = await checker.online_service(service=service)
@@ -41,10 +105,7 @@ async def run_beater(id_service: int):
                     server_status=res[2],
                     timestamp=ts.timestamp()
                     )
-                await crud.beat.create_beat(
-                    session=session,
-                    beat_create=bc
-                )
+                await store_beat(beat=bc, service=service)
             case ServiceTypeEnum.SYSTEMD:
                 res = await checker.systemd_service_status(service=service)
                 bc = BeatCreate(
@@ -53,110 +114,640 @@ async def run_beater(id_service: int):
                     server_status=res[1],
                     timestamp=ts.timestamp()
                 )
-                await crud.beat.create_beat(
-                    session=session,
-                    beat_create=bc
-                )
+                await store_beat(beat=bc, service=service)
             case ServiceTypeEnum.JOURNAL:
-                res = await checker.journalctl(service=service)
+                res = await checker.journalctl(service=service, session=session)
                 bc = BeatCreate(
                     id_service=id_service,
                     Active=res[0],
                     server_status=res[1],
                     timestamp=ts.timestamp()
                 )
-                await crud.beat.create_beat(
-                    session=session,
-                    beat_create=bc
-                )
-        delay = (datetime.datetime.now(datetime.UTC)-ts).total_seconds()
-        interval = float(service.config.interval)
-        sleep = interval-delay
-        i = 2
-        if sleep < 0:
-            while sleep < 0:
-                sleep = (i * interval) - delay
+                await store_beat(beat=bc, service=service)
+        return float(service.config.interval)
+    finally:
+        session.close()
+
+
+async def run_systemd_beaters(id_services: list[int]) -> dict[int, float | None]:
+    """
+    run a single check for systemd services of the same server in one ssh round trip
+    and queue their beats.
+    returns check interval of each service or `None` if service does not exist anymore
+    """
+    ts = datetime.datetime.now(datetime.UTC)
+    session = next(get_db())
+    try:
+        intervals: dict[int, float | None] = {i: None for i in id_services}
+        services = await crud.service.get_services_by_ids(
+            session=session,
+            id_services=id_services
+        )
+        if not services:
+            logger.warning("services with ids %s not found!", id_services)
+            return intervals
+        res = await checker.systemd_services_status(services=services)
+        for service in services:
+            bc = BeatCreate(
+                id_service=service.id_service, # type: ignore
+                Active=res[service.id_service][0], # type: ignore
+                server_status=res[service.id_service][1], # type: ignore
+                timestamp=ts.timestamp()
+            )
+            await store_beat(beat=bc, service=service)
+            intervals[service.id_service] = float(service.config.interval) # type: ignore
+        return intervals
+    finally:
+        session.close()
+
+
+def phase_offset(key: str, interval: float) -> float:
+    """
+    stable offset of a key within interval
+    """
+    return zlib.crc32(key.encode("utf-8")) / 2 ** 32 * interval
+
+
+def next_tick(after: float, interval: float, offset: float) -> float:
+    """
+    first tick of a phase strictly after `after`
+    """
+    return offset + (math.floor((after - offset) / interval) + 1) * interval
+
+
+class BeatScheduler(Singleton):
+    """
+    Singleton based scheduler which runs beaters of all services on a single event loop.
+    next due time of every service is kept in a heap and due checks are handed
+    to a bounded pool of worker tasks.
+    services tick on a stable phase within their interval, so services with the same
+    interval do not check at the same moment.
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            # heap items: (due time on monotonic clock, token, id_service)
+            cls.queue: list[tuple[float, int, int]] = []
+            # latest valid token of each scheduled service. heap items with any
+            # other token are stale and will be dropped when popped.
+            cls.tokens: dict[int, int] = {}
+            cls.intervals: dict[int, float] = {}
+            # (service type, id_server) of services, used to batch systemd checks
+            cls.kinds: dict[int, tuple[ServiceTypeEnum, int]] = {}
+            # shared phase keys of online services with identical probes, see `checker.online_probe_key`
+            cls.phase_keys: dict[int, str] = {}
+            # consecutive overruns of services, used by backoff policy
+            cls.overruns: dict[int, int] = {}
+            cls.overrun_policy = SCHEDULER_OVERRUN_POLICY
+            if cls.overrun_policy not in OVERRUN_POLICIES:
+                logger.warning("unknown overrun policy %s, skip is used", cls.overrun_policy)
+                cls.overrun_policy = "skip"
+            cls.counter = itertools.count()
+            cls.lock = threading.Lock()
+            cls.loop: asyncio.AbstractEventLoop | None = None
+            cls.wakeup: asyncio.Event | None = None
+            cls.stopped = False
+            # monotonic time since which dispatching is held, see `hold`
+            cls.held_since: float | None = None
+            logger.debug("Beat Scheduler initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def schedule(
+            cls,
+            id_service: int,
+            delay: float | None = None,
+            service_type: ServiceTypeEnum | None = None,
+            id_server: int | None = None,
+            interval: float | None = None,
+            phase_key: str | None = None
+        ):
+        """
+        schedule (or reschedule) a service to be checked after `delay` seconds.
+        without `delay` the service is checked on its next phase tick if its interval
+        is known, otherwise right away.
+        `service_type` and `id_server` let systemd services of a server be checked together,
+        services with the same `phase_key` tick together so their checks can be coalesced.
+        given `service_type`, the service is described anew, so without `phase_key`
+        a previous phase key is cleared.
+        safe to be called from any thread.
+        """
+        with cls.lock:
+            if service_type is not None and id_server is not None:
+                cls.kinds[id_service] = (service_type, id_server)
+            if phase_key is not None:
+                cls.phase_keys[id_service] = phase_key
+            elif service_type is not None:
+                cls.phase_keys.pop(id_service, None)
+            if interval is not None:
+                cls.intervals[id_service] = interval
+            now = time.monotonic()
+            interval = cls.intervals.get(id_service)
+            if delay is not None:
+                due = now + delay
+            elif interval:
+                due = cls.__tick_after(id_service=id_service, after=now, interval=interval)
+            else:
+                due = now
+            token = next(cls.counter)
+            cls.tokens[id_service] = token
+            heapq.heappush(cls.queue, (due, token, id_service))
+        logger.debug("service id: %d scheduled in %.2f seconds", id_service, due - now)
+        cls.__wake()
+
+
+    @classmethod
+    def __tick_after(cls, id_service: int, after: float, interval: float) -> float:
+        """
+        due time of next tick of a service after `after` (lock must be held).
+        systemd services of a server share one phase and get no jitter, so they stay batched.
+        so do online services with identical probes, so they share one probe
+        """
+        kind = cls.kinds.get(id_service)
+        if kind and kind[0] == ServiceTypeEnum.SYSTEMD:
+            key, jitter = f"server-{kind[1]}", 0.0
+        elif id_service in cls.phase_keys:
+            key, jitter = cls.phase_keys[id_service], 0.0
+        else:
+            key, jitter = f"service-{id_service}", SCHEDULER_JITTER
+        tick = next_tick(after=after, interval=interval, offset=phase_offset(key, interval))
+        return tick + random.uniform(0, jitter * interval)
+
+
+    @classmethod
+    def unschedule(cls, id_service: int):
+        """
+        stop checking a service. safe to be called from any thread.
+        """
+        with cls.lock:
+            cls.tokens.pop(id_service, None)
+            cls.intervals.pop(id_service, None)
+            cls.kinds.pop(id_service, None)
+            cls.phase_keys.pop(id_service, None)
+            cls.overruns.pop(id_service, None)
+        logger.debug("service id: %d unscheduled", id_service)
+
+
+    @classmethod
+    def hold(cls):
+        """
+        keep scheduled services from being dispatched until `release` is called
+        """
+        with cls.lock:
+            if cls.held_since is None:
+                cls.held_since = time.monotonic()
+
+
+    @classmethod
+    def release(cls):
+        """
+        start dispatching. due times are shifted by the time scheduler was held,
+        so services keep their spread instead of all being due at once.
+        """
+        with cls.lock:
+            if cls.held_since is None:
+                return
+            shift = time.monotonic() - cls.held_since
+            cls.held_since = None
+            cls.queue = [(due + shift, token, id_service) for due, token, id_service in cls.queue]
+            heapq.heapify(cls.queue)
+        logger.info("Beat Scheduler released after %.1fs", shift)
+        cls.__wake()
+
+
+    @classmethod
+    def stop(cls):
+        """
+        stop dispatching checks. safe to be called from any thread.
+        """
+        cls.stopped = True
+        cls.__wake()
+
+
+    @classmethod
+    def __wake(cls):
+        """
+        wake up scheduler loop to re-evaluate next due time
+        """
+        if cls.loop is not None and cls.wakeup is not None and not cls.loop.is_closed():
+            cls.loop.call_soon_threadsafe(cls.wakeup.set)
+
+
+    @classmethod
+    def __pop_due(cls) -> list[list[tuple[int, int, float]]]:
+        """
+        pop all due services from heap and group them into jobs.
+        systemd services of the same server are put in one job, including the ones
+        which are due within `SYSTEMD_BATCH_WINDOW` seconds.
+        returns list of jobs, each one a list of (id_service, token, due time)
+        """
+        jobs = []
+        with cls.lock:
+            if cls.held_since is not None:
+                return jobs
+            now = time.monotonic()
+            due, early = [], []
+            while cls.queue and cls.queue[0][0] <= now + SYSTEMD_BATCH_WINDOW:
+                due_time, token, id_service = heapq.heappop(cls.queue)
+                if cls.tokens.get(id_service) != token:
+                    continue
+                if due_time <= now:
+                    due.append((id_service, token, due_time))
+                else:
+                    early.append((id_service, token, due_time))
+            batches: dict[int, list[tuple[int, int, float]]] = {}
+            for item in due:
+                kind = cls.kinds.get(item[0])
+                if kind and kind[0] == ServiceTypeEnum.SYSTEMD:
+                    batches.setdefault(kind[1], []).append(item)
+                else:
+                    jobs.append([item])
+            for item in early:
+                kind = cls.kinds.get(item[0])
+                if kind and kind[0] == ServiceTypeEnum.SYSTEMD and kind[1] in batches:
+                    batches[kind[1]].append(item)
+                else:
+                    heapq.heappush(cls.queue, (item[2], item[1], item[0]))
+            jobs.extend(batches.values())
+        return jobs
+
+
+    @classmethod
+    def __next_timeout(cls) -> float | None:
+        """
+        seconds until next due service or `None` if nothing is scheduled or scheduler is held
+        """
+        with cls.lock:
+            if not cls.queue or cls.held_since is not None:
+                return None
+            return max(cls.queue[0][0] - time.monotonic(), 0)
+
+
+    @classmethod
+    def __reschedule(cls, id_service: int, token: int, due: float, interval: float | None):
+        """
+        put a checked service back on heap for its next tick.
+        it is dropped if the service was updated, deleted or does not exist anymore.
+        """
+        with cls.lock:
+            if cls.tokens.get(id_service) != token:
+                return
+            if interval is None:
+                cls.tokens.pop(id_service, None)
+                cls.intervals.pop(id_service, None)
+                cls.kinds.pop(id_service, None)
+                cls.phase_keys.pop(id_service, None)
+                cls.overruns.pop(id_service, None)
+                return
+            cls.intervals[id_service] = interval
+            now = time.monotonic()
+            # jitter of previous tick is below half an interval, so it is not carried over
+            next_due = cls.__tick_after(id_service=id_service, after=due, interval=interval)
+            if next_due < now:
+                next_due = cls.__overrun(id_service=id_service, missed=next_due, now=now, interval=interval)
+            else:
+                cls.overruns.pop(id_service, None)
+            heapq.heappush(cls.queue, (next_due, token, id_service))
+
+
+    @classmethod
+    def __overrun(cls, id_service: int, missed: float, now: float, interval: float) -> float:
+        """
+        next due time of a service whose check overran its next tick,
+        based on overrun policy (lock must be held)
+        """
+        overruns = cls.overruns.get(id_service, 0) + 1
+        cls.overruns[id_service] = overruns
+        skipped = int((now - missed) // interval) + 1
+        metrics.incr("scheduler_overruns")
+        metrics.incr(f"scheduler_overrun_{cls.overrun_policy}")
+        if cls.overrun_policy == "immediate":
             logger.info(
-                "service id: %d. beater delayed so long. %d ticks will be skipped.",
+                "service id: %d. beater delayed so long. %d ticks missed, running once now.",
                 id_service,
-                i
+                skipped
             )
-        session.close()
-        await asyncio.sleep(sleep)
+            return now
+        if cls.overrun_policy == "backoff":
+            factor = min(2 ** overruns, SCHEDULER_MAX_BACKOFF)
+            logger.info(
+                "service id: %d. beater delayed so long %d times in a row. backing off to %.0fs.",
+                id_service,
+                overruns,
+                factor * interval
+            )
+            return cls.__tick_after(
+                id_service=id_service,
+                after=now + (factor - 1) * interval,
+                interval=interval
+            )
+        logger.info(
+            "service id: %d. beater delayed so long. %d ticks will be skipped.",
+            id_service,
+            skipped
+        )
+        return cls.__tick_after(id_service=id_service, after=now, interval=interval)
+
+
+    @classmethod
+    async def __worker(cls, jobs: asyncio.Queue):
+        """
+        take due jobs from jobs queue and check their services
+        """
+        while True:
+            job = await jobs.get()
+            ids = [i[0] for i in job]
+            try:
+                if len(job) == 1:
+                    intervals = {ids[0]: await run_beater(id_service=ids[0])}
+                else:
+                    intervals = await run_systemd_beaters(id_services=ids)
+            except Exception as e:
+                logger.exception(e)
+                intervals = {i: cls.intervals.get(i, DEFAULT_RETRY_INTERVAL) for i in ids}
+            finally:
+                jobs.task_done()
+            for id_service, token, due in job:
+                cls.__reschedule(
+                    id_service=id_service,
+                    token=token,
+                    due=due,
+                    interval=intervals.get(id_service)
+                )
+
+
+    @classmethod
+    async def run(cls):
+        """
+        run scheduler loop until `stop` is called
+        """
+        cls.loop = asyncio.get_running_loop()
+        cls.wakeup = asyncio.Event()
+        cls.stopped = False
+        jobs: asyncio.Queue = asyncio.Queue(maxsize=SCHEDULER_WORKERS)
+        workers = [
+            asyncio.create_task(cls.__worker(jobs)) for _ in range(SCHEDULER_WORKERS)
+        ]
+        logger.info("Beat Scheduler started with %d workers", SCHEDULER_WORKERS)
+        try:
+            while not cls.stopped:
+                cls.wakeup.clear()
+                for job in cls.__pop_due():
+                    await jobs.put(job)
+                try:
+                    await asyncio.wait_for(cls.wakeup.wait(), timeout=cls.__next_timeout())
+                except TimeoutError:
+                    pass
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await http_client.close_client()
+            logger.info("Beat Scheduler stopped")
+
+
+def channel_cares(channel: int, delta: dict) -> bool:
+    """
+    check if a delta of live board belongs to a channel
+    """
+    if channel > 0:
+        return delta["id_service"] == channel
+    if channel < 0:
+        return delta["id_server"] == -1 * channel
+    return True
+
+
+class LiveBoard(Singleton):
+    """
+    Singleton based sequencer of live board deltas.
+    every new beat becomes a "beat" delta with a monotonically increasing sequence
+    number. recent deltas are kept so reconnecting clients receive only what they missed.
+    """
+    @classmethod
+    def __init__(cls):
+        try:
+            cls.seq = 0
+            cls.history: deque[dict] = deque(maxlen=LIVE_BOARD_HISTORY)
+            cls.lock = threading.Lock()
+            logger.debug("Live Board initialized")
+        except Exception as e:
+            logger.exception(e)
+
+
+    @classmethod
+    def append(cls, event: dict) -> dict:
+        """
+        turn a beat event into a sequenced delta
+        """
+        with cls.lock:
+            cls.seq += 1
+            delta = {"type": "beat", "seq": cls.seq, **event}
+            cls.history.append(delta)
+        return delta
+
+
+    @classmethod
+    def missed(cls, channel: int, seq: int) -> list[dict] | None:
+        """
+        deltas of a channel after `seq`.
+        returns `None` if they are not available anymore and a snapshot is needed
+        """
+        with cls.lock:
+            if seq > cls.seq:
+                return None
+            if cls.history and seq < cls.history[0]["seq"] - 1:
+                return None
+            if not cls.history and seq != cls.seq:
+                return None
+            return [d for d in cls.history if d["seq"] > seq and channel_cares(channel, d)]
+
+
+async def live_board_snapshot(session: Session, channel: int) -> dict:
+    """
+    current state of a live board channel
+    channel:
+        `0` for all services grouped by id_server
+        `positive int` for a service
+        `negative int` for services of a server
+    """
+    data: dict | list
+    seq = LiveBoard().seq
+    if channel > 0:
+        service = await crud.service.get_service_by_id(session=session, id_service=channel)
+        data = service_with_beats(info=service_info(service=service)) if service else {}
+    elif channel < 0:
+        services = await crud.service.get_all_services_by_server(
+            session=session,
+            id_server=-1 * channel,
+            offset=0,
+            limit=-1
+        )
+        data = [service_with_beats(info=service_info(service=s)) for s in services]
+    else:
+        services = await crud.service.get_all_services(session=session, offset=0, limit=-1)
+        data = {}
+        for s in services:
+            data.setdefault(s.id_server, []).append( # type: ignore
+                service_with_beats(info=service_info(service=s))
+            )
+    return {
+        "type": "snapshot",
+        "seq": seq,
+        "max_beats": MAX_CHART_BARS,
+        "data": data
+    }
+
+
+async def live_board_sync(session: Session, channel: int, seq: int | None = None) -> list[dict]:
+    """
+    messages which bring a client of a channel up to date.
+    missed deltas after `seq` if they are still available and at most
+    `LIVE_BOARD_MAX_RESUME`, otherwise a snapshot
+    """
+    if seq is not None:
+        missed = LiveBoard().missed(channel=channel, seq=seq)
+        if missed is not None and len(missed) <= LIVE_BOARD_MAX_RESUME:
+            return missed
+    return [await live_board_snapshot(session=session, channel=channel)]
 
 
 async def update_live_board():
     """
-    update status board with latest check results and send to clients using WS connection manager
+    push new beats to clients using WS connection manager as sequenced deltas
+    as soon as they are published
     """
     from app.src.connection_manager import ServiceConnectionManager
-    session = next(get_db())
+    cm = ServiceConnectionManager()
+    live_board = LiveBoard()
+    events = EventBus().subscribe(topic=BEAT_TOPIC)
     while True:
-        cm = ServiceConnectionManager()
+        event = await events.get()
         try:
+            delta = live_board.append(event=event)
             if len(cm.active_connections):
-                services = await crud.service.get_all_services(session=session)
-                message = { 0: {} }
-                for s in services:
-                    s.beats = s.beats[-MAX_CHART_BARS:]
-                    swb = ServiceWithBeats.model_validate(s)
-                    swb = jsonable_encoder(swb)
-
-                    # Service Monitor
-                    message.update({
-                        s.id_server: swb
-                    })
-
-                    # Server Monitor
-                    if -1 * s.id_server in message:
-                        message[-1 * s.id_server].append(swb)
-                    else:
-                        message.update({
-                            -1 * s.id_server: [swb]
-                        })
-
-                    # Monitor All Services
-                    if 0 in message:
-                        if s.id_server in message[0]:
-                            message[0][s.id_server].append(swb)
-                        else:
-                            message[0].update({
-                                s.id_server: [swb]
-                            })
-                    else:
-                        message.update({
-                            0: {
-                                s.id_server: [swb]
-                            }
-                        })
-                await cm.auto_broadcast(message)
+                # Service Monitor, Server Monitor and Monitor All Services
+                await cm.broadcast_many(
+                    message=delta,
+                    channels=[delta["id_service"], -1 * delta["id_server"], 0]
+                )
         except Exception as e:
             logger.exception(e)
-        session.close()
-        await asyncio.sleep(10)
+
+
+async def collect_server_load(
+        id_server: int,
+        ssh,
+        semaphore: asyncio.Semaphore,
+        last_load: dict[int, dict],
+        in_flight: dict[int, asyncio.Task]
+    ) -> dict:
+    """
+    collect load of a server within `SERVER_LOAD_TIMEOUT` seconds.
+    a server which misses the deadline is reported with its last known load as stale.
+    its collection is not cancelled (blocking ssh calls can not be) but kept in `in_flight`,
+    and the server is not probed again until it finished.
+    with `SERVER_METRICS_STREAM` enabled, load is read from the server's metrics stream.
+    """
+    from app.src.connection_manager import SERVER_METRICS_STREAM, SSHManager
+    sshm = SSHManager()
+
+    async def collect() -> dict:
+        async with semaphore:
+            active = await sshm.is_active(ssh=ssh)
+            status, stale = None, False
+            if active and SERVER_METRICS_STREAM:
+                sshm.start_metrics_stream(id_server=id_server)
+                status, stale = sshm.get_streamed_status(id_server=id_server)
+            elif active:
+                status = await sshm.get_server_status(ssh=ssh, retry=0, id_server=id_server)
+        load = {
+            "active": active,
+            "status": status,
+            "stale": stale
+        }
+        last_load[id_server] = load
+        return load
+
+    def stale() -> dict:
+        last = last_load.get(id_server, {})
+        return {
+            "active": last.get("active", False),
+            "status": last.get("status"),
+            "stale": True
+        }
+
+    collecting = in_flight.get(id_server)
+    if collecting is not None and not collecting.done():
+        metrics.incr("server_load_skipped")
+        return stale()
+    collecting = asyncio.create_task(collect())
+    in_flight[id_server] = collecting
+    collecting.add_done_callback(
+        lambda t: in_flight.pop(id_server, None) if in_flight.get(id_server) is t else None
+    )
+    done, _ = await asyncio.wait({collecting}, timeout=SERVER_LOAD_TIMEOUT)
+    if not done:
+        logger.info("server id: %d missed load collection deadline", id_server)
+        metrics.incr("server_load_stale")
+        return stale()
+    try:
+        return collecting.result()
+    except Exception as e:
+        logger.exception(e)
+        return stale()
 
 
 async def update_server_load_board():
     """
-    update status board with latest check results and send to clients using WS connection manager
+    update status board with latest check results and send to clients using WS connection manager.
+    load of every server is also recorded into server metrics history.
+    without clients servers are only probed as often as history keeps a sample
     """
     from app.src.connection_manager import ServerConnectionManager, SSHManager
+    semaphore = asyncio.Semaphore(SERVER_LOAD_CONCURRENCY)
+    last_load: dict[int, dict] = {}
+    in_flight: dict[int, asyncio.Task] = {}
+    store = ServerMetricStore()
+    last_collected = -math.inf
     while True:
+        started = time.monotonic()
         try:
             cm = ServerConnectionManager()
+            if not len(cm.active_connections) and \
+                    started - last_collected < SERVER_METRICS_RAW_INTERVAL:
+                await asyncio.sleep(SERVER_LOAD_INTERVAL)
+                continue
+            last_collected = started
+            # samples are stamped with cycle start, so they are kept one per interval
+            now = time.time()
             sshm = SSHManager()
-            if len(cm.active_connections):
-                response = {}
-                for s in sshm.active_connections.items():
-                    active = await sshm.is_active(ssh=s[1], retry=0)
-                    status = await sshm.get_server_status(ssh=s[1], retry=0)
-                    response.update({
-                        s[0]: {
-                            "active": active,
-                            "status": status
-                        }
-                    })
-                await cm.broadcast(message=response)
+            connections = list(sshm.active_connections.items())
+            response = {}
+            if connections:
+                loads = await asyncio.gather(*[
+                    collect_server_load(
+                        id_server=id_server,
+                        ssh=ssh,
+                        semaphore=semaphore,
+                        last_load=last_load,
+                        in_flight=in_flight
+                    ) for id_server, ssh in connections
+                ])
+                response = {
+                    id_server: load for (id_server, _), load in zip(connections, loads)
+                }
+            # servers without a connected client are waiting for ssh supervisor
+            for id_server in list(sshm.reconnecting):
+                response.setdefault(id_server, {"active": False, "status": None, "stale": False})
+            if response:
+                for id_server, load in response.items():
+                    if load["active"] and not load["stale"]:
+                        store.add(id_server=id_server, status=load["status"], timestamp=now)
+                if len(cm.active_connections):
+                    await cm.broadcast(message=response)
+            await store.flush()
         except Exception as e:
             logger.exception(e)
-        await asyncio.sleep(1)
+        await asyncio.sleep(max(SERVER_LOAD_INTERVAL - (time.monotonic() - started), 0))
@@ -0,0 +1,77 @@
+"""
+Testing recent beats cache
+"""
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app import crud
+from app.models import Beat, BeatCreate
+from app.src.beat_cache import BeatCache, BeatRing
+
+
+def make_beat(id_service: int, timestamp: float, latency: float | None = None) -> BeatCreate:
+    """
+    build a beat for testing
+    """
+    return BeatCreate(
+        id_service=id_service,
+        Active=True,
+        latency=latency,
+        timestamp=timestamp,
+        server_status=True
+    )
+
+
+def test_beat_ring_overwrites_oldest():
+    """
+    test ring keeps only the latest beats in order
+    """
+    ring = BeatRing(size=3)
+    assert not ring.to_list()
+    for i in range(5):
+        ring.append(make_beat(id_service=1, timestamp=float(i), latency=i / 10))
+    beats = ring.to_list()
+    assert [b["timestamp"] for b in beats] == [2.0, 3.0, 4.0]
+    assert beats[-1] == {"Active": True, "latency": 0.4, "timestamp": 4.0, "server_status": True}
+
+
+def test_beat_cache_warm_add_remove():
+    """
+    test cache is warmed from db beats and updated by new beats
+    """
+    cache = BeatCache()
+    cache.warm({1: [make_beat(id_service=1, timestamp=1.0)]}) # type: ignore
+    cache.add(make_beat(id_service=1, timestamp=2.0))
+    cache.add(make_beat(id_service=2, timestamp=3.0))
+    assert [b["timestamp"] for b in cache.get(id_service=1)] == [1.0, 2.0]
+    assert cache.get(id_service=2)[0]["latency"] is None
+    cache.remove(id_service=1)
+    assert cache.get(id_service=1) == []
+
+
+@pytest.mark.asyncio
+async def test_get_latest_beats_per_service():
+    """
+    test latest beats are limited per service and ordered by timestamp
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # inserted out of order, service 3 has fewer beats than limit
+        for id_service, count in ((1, 6), (2, 4), (3, 2)):
+            for i in reversed(range(count)):
+                session.add(Beat.model_validate(make_beat(id_service=id_service, timestamp=float(i))))
+        session.commit()
+
+        beats = await crud.beat.get_latest_beats(session=session, limit=3)
+        assert sorted(beats) == [1, 2, 3]
+        assert [b.timestamp for b in beats[1]] == [3.0, 4.0, 5.0]
+        assert [b.timestamp for b in beats[2]] == [1.0, 2.0, 3.0]
+        assert [b.timestamp for b in beats[3]] == [0.0, 1.0]
+        assert all(b.id_service == i for i, bs in beats.items() for b in bs)
+
+        beats = await crud.beat.get_latest_beats(session=session, limit=1, id_services=[2, 3])
+        assert {i: [b.timestamp for b in bs] for i, bs in beats.items()} == {2: [3.0], 3: [1.0]}
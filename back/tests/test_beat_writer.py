@@ -0,0 +1,76 @@
+"""
+Testing write-behind beat buffer
+"""
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from app.models import Beat, BeatCreate, JournalCursor
+from app.src import beat_writer
+from app.src.beat_writer import BeatWriter
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(monkeypatch):
+    """
+    in memory db engine used by beat writer
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def get_db_override():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(beat_writer, "get_db", get_db_override)
+    BeatWriter.__init__()
+    yield engine
+    BeatWriter.close(timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_beat_writer_flush_on_close(engine):
+    """
+    test pending beats are bulk inserted when writer closes
+    """
+    writer = BeatWriter()
+    writer.start()
+    for i in range(1200):
+        await writer.put(BeatCreate(
+            id_service=1,
+            Active=True,
+            latency=0.1,
+            timestamp=float(i),
+            server_status=True
+        ))
+    writer.close(timeout=5)
+
+    with Session(engine) as session:
+        beats = session.exec(select(Beat)).all()
+    assert len(beats) == 1200
+    assert sorted(b.timestamp for b in beats) == [float(i) for i in range(1200)]
+    assert not writer.buffer
+
+
+@pytest.mark.asyncio
+async def test_beat_writer_journal_cursors(engine):
+    """
+    test only latest pending journal cursor of a service is stored
+    """
+    writer = BeatWriter()
+    for i in range(3):
+        writer.put_cursor(JournalCursor(id_service=1, cursor=f"c{i}", matched=bool(i % 2), timestamp=i))
+    writer.put_cursor(JournalCursor(id_service=2, cursor="x", matched=True, timestamp=0))
+    writer.put_cursor(JournalCursor(id_service=3, cursor="y", matched=True, timestamp=0))
+    writer.discard_cursor(id_service=3)
+    pending = writer.get_cursor(id_service=1)
+    assert pending is not None and pending.cursor == "c2"
+    writer.close(timeout=5)
+
+    with Session(engine) as session:
+        cursors = {c.id_service: c for c in session.exec(select(JournalCursor)).all()}
+    assert sorted(cursors) == [1, 2]
+    assert (cursors[1].cursor, cursors[1].matched) == ("c2", False)
+    assert writer.get_cursor(id_service=1) is None
@@ -99,3 +99,335 @@
 #     r.srem("services", i)
 #     r.delete(i)
 #     r.delete(f"{i}_status")
+
+
+import asyncio
+
+import httpx
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from app.models import Config, Server, Service, ServiceTypeEnum
+from app.models.config import (ExecutionEnum, JournalOperatorEnaum, MethodEnum,
+                               OnlineOperatorEnaum, TargetEnaum)
+from app.src import checker, http_client
+from app.src.beat_writer import BeatWriter
+from app.src.checker import (ContentReader, curl_command, journalctl_command,
+                              journalctl_parser, systemctl_show_parser)
+from app.src.predicates import compile_predicate
+from app.src.single_flight import SingleFlight
+
+
+def test_systemctl_show_parser():
+    """
+    test parsing `systemctl show` output of multiple units
+    """
+    output = (
+        "Id=redis.service\nActiveState=active\nSubState=running\n\n"
+        "SubState=dead\nActiveState=inactive\nId=noservice.service\n\n"
+        "Id=ssh.service\nActiveState=failed\nSubState=failed\n"
+    )
+    units = systemctl_show_parser(response=output)
+    assert len(units) == 3
+    assert units[0] == {"Id": "redis.service", "ActiveState": "active", "SubState": "running"}
+    assert units[1]["ActiveState"] == "inactive"
+    assert units[1]["Id"] == "noservice.service"
+    assert units[2]["ActiveState"] == "failed"
+    assert not systemctl_show_parser(response="")
+
+
+@pytest.mark.asyncio
+async def test_systemd_services_status(monkeypatch):
+    """
+    test units are quoted and a unit missing from batch output does not fail the batch
+    """
+    from app.src.connection_manager import SSHManager
+    commands = []
+
+    async def get_ssh_client(server, id_server):
+        return object()
+
+    async def exec_command(ssh, command):
+        commands.append(command)
+        if "'redis server'" in command and len(commands) == 1:
+            # unit with a space is not reported by batch
+            return "Id=nginx.service\nActiveState=active\n\nId=ssh.service\nActiveState=failed\n"
+        return "Id=redis server.service\nActiveState=active\n"
+
+    monkeypatch.setattr(SSHManager, "get_ssh_client", get_ssh_client)
+    monkeypatch.setattr(SSHManager, "exec_command", exec_command)
+    server = Server(id_server=1, name="s", ip="127.0.0.1", port=22, username="root")
+    services = [
+        Service(id_service=i, id_server=1, server=server, service_name=name,
+                service_type=ServiceTypeEnum.SYSTEMD)
+        for i, name in enumerate(("nginx", "redis server", "ssh.service"), start=1)
+    ]
+    result = await checker.systemd_services_status(services=services)
+    assert commands[0].endswith("-- nginx 'redis server' ssh.service")
+    assert commands[1].endswith("-- 'redis server'")
+    assert result == {1: (True, True), 2: (True, True), 3: (False, True)}
+
+
+def test_journalctl_command_and_parser():
+    """
+    test journalctl checks read new matching lines after cursor only
+    """
+    first = journalctl_command(service_name="nginx", desired="started", cursor=None)
+    assert "-n 10" in first and "--after-cursor" not in first and " -g " not in first
+
+    command = journalctl_command(service_name="nginx", desired="Up (ok)", cursor="s=abc;i=1f")
+    assert "--after-cursor='s=abc;i=1f'" in command
+    assert "-g 'Up\\ \\(ok\\)'" in command
+
+    output = (
+        "### cursor\n-- cursor: s=abc;i=2a\n"
+        "### entries\nnginx Up (ok)\nnginx reloading\n"
+    )
+    assert journalctl_parser(response=output) == ("s=abc;i=2a", ["nginx Up (ok)", "nginx reloading"])
+    assert journalctl_parser(response="### cursor\n### entries\n") == (None, [])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("operator", [JournalOperatorEnaum.IN, JournalOperatorEnaum.NOTIN])
+async def test_journalctl(monkeypatch, operator: JournalOperatorEnaum):
+    """
+    test journalctl checks keep cursor and previous result when there are no new lines
+    """
+    from app.src.connection_manager import SSHManager
+    commands = []
+    outputs = [
+        # first check: last lines, no cursor yet
+        "### cursor\n-- cursor: s=abc;i=1\n### entries\nnginx started\nnginx ready\n",
+        # no new entries since previous check
+        "### cursor\n-- cursor: s=abc;i=1\n### entries\n",
+        # new lines, none of them matches exactly (host filter is case insensitive)
+        "### cursor\n-- cursor: s=abc;i=2\n### entries\nnginx Started\n",
+    ]
+
+    async def get_ssh_client(server, id_server):
+        return object()
+
+    async def exec_command(ssh, command):
+        commands.append(command)
+        return outputs[len(commands) - 1]
+
+    monkeypatch.setattr(SSHManager, "get_ssh_client", get_ssh_client)
+    monkeypatch.setattr(SSHManager, "exec_command", exec_command)
+    # keep cursors pending in writer instead of flushing them
+    monkeypatch.setattr(BeatWriter, "start", classmethod(lambda cls: None))
+    BeatWriter.__init__()
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    service = Service(
+        id_service=1,
+        id_server=1,
+        service_name="nginx",
+        service_type=ServiceTypeEnum.JOURNAL,
+        config=Config(id_service=1, desired_response="started", operator=operator) # type: ignore
+    )
+    negate = operator == JournalOperatorEnaum.NOTIN
+
+    with Session(engine) as session:
+        assert await checker.journalctl(service=service, session=session) == (not negate, True)
+        assert "--after-cursor" not in commands[0]
+        cursor = BeatWriter.get_cursor(id_service=1)
+        assert cursor is not None and (cursor.cursor, cursor.matched) == ("s=abc;i=1", True)
+
+        assert await checker.journalctl(service=service, session=session) == (not negate, True)
+        assert "--after-cursor='s=abc;i=1'" in commands[1] and "-g started" in commands[1]
+        cursor = BeatWriter.get_cursor(id_service=1)
+        assert cursor is not None and (cursor.cursor, cursor.matched) == ("s=abc;i=1", True)
+
+        assert await checker.journalctl(service=service, session=session) == (negate, True)
+        assert "--after-cursor='s=abc;i=1'" in commands[2]
+        cursor = BeatWriter.get_cursor(id_service=1)
+        assert cursor is not None and (cursor.cursor, cursor.matched) == ("s=abc;i=2", False)
+    BeatWriter.__init__()
+
+
+def test_compile_predicate():
+    """
+    test predicates of operators over str and bytes outputs and their caching
+    """
+    assert compile_predicate("in", "ok")("status: ok")
+    assert compile_predicate("in", "ok")(b"status: ok")
+    assert compile_predicate("not in", "ok")("failed")
+    assert compile_predicate("==", "200")("200")
+    assert not compile_predicate("!=", "200")(b"200")
+    assert compile_predicate("regex", r"^2\d\d$")("204")
+    assert compile_predicate("regex", r"up \d+ days")(b"host up 12 days")
+    assert compile_predicate("in", "x") is compile_predicate("in", "x")
+    with pytest.raises(ValueError):
+        compile_predicate("regex", "(")
+    with pytest.raises(ValueError):
+        compile_predicate("like", "x")
+
+
+def test_content_reader():
+    """
+    test content checks skip response headers and are decided as soon as possible
+    """
+    reader = ContentReader(operator="in", desired="ready", headers=True)
+    assert not reader.feed(b"HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 200 OK\r\nServer: x\r\n")
+    assert not reader.feed(b"\r\nstatus: rea")
+    assert reader.feed(b"dy, more to come")
+    assert reader.result() and bytes(reader.body) == b"status: ready, more to come"
+
+    reader = ContentReader(operator="==", desired="ok")
+    assert reader.feed(b"okay")
+    assert not reader.result()
+    reader = ContentReader(operator="not in", desired="error")
+    assert not reader.feed(b"all good")
+    assert reader.result()
+    reader = ContentReader(operator="regex", desired=r"up \d+ days")
+    assert not reader.feed(b"up 3 days")
+    assert reader.result()
+    # http/2 status lines, codes ending with 1 are not interim responses
+    for status in (b"201 ", b"401 ", b"101 "):
+        reader = ContentReader(operator="in", desired="ready", headers=True)
+        reader.feed(b"HTTP/2 " + status + b"\r\ncontent-type: text/plain\r\n\r\nstatus: ready")
+        assert reader.result() == (status != b"101 ")
+    reader = ContentReader(operator="in", desired="ready", headers=True)
+    assert reader.feed(b"HTTP/2 103\r\nlink: x\r\n\r\nHTTP/2 201\r\n\r\nstatus: ready")
+    assert bytes(reader.body) == b"status: ready"
+    # nothing received
+    assert not ContentReader(operator="not in", desired="x", headers=True).result()
+
+
+def test_curl_command():
+    """
+    test status checks discard body on server and content checks are capped
+    """
+    status = curl_command(method=MethodEnum.GET, url="http://web/health", data=None, status_only=True)
+    assert "-o /dev/null" in status and "head -c" not in status
+    content = curl_command(method=MethodEnum.POST, url="http://web/q?a=1&b=2", data='{"a": 1}', status_only=False)
+    assert "-D -" in content and "-d '{\"a\": 1}'" in content
+    assert content.endswith(f"'http://web/q?a=1&b=2' | head -c {checker.ONLINE_CONTENT_MAX_BYTES}")
+
+
+@pytest.mark.asyncio
+async def test_online_service_direct(monkeypatch):
+    """
+    test direct online checks are sent from backend with shared http client
+    """
+    requests = []
+
+    def handler(request: httpx.Request):
+        requests.append(request)
+        if request.url.path == "/down":
+            raise httpx.ConnectError("refused", request=request)
+        if request.url.path == "/big":
+            return httpx.Response(200, content=b"x" * (checker.ONLINE_CONTENT_MAX_BYTES + 10) + b"up")
+        return httpx.Response(200, text="service is up")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(http_client, "get_client", lambda: client)
+
+    def service(url: str, desired: str, operator: str, target: str) -> Service:
+        return Service(
+            id_service=1,
+            id_server=1,
+            service_name="web",
+            service_type=ServiceTypeEnum.ONLINE,
+            config=Config(
+                id_service=1,
+                url=url,
+                method=MethodEnum.GET,
+                desired_response=desired,
+                operator=OnlineOperatorEnaum(operator),
+                target=TargetEnaum(target),
+                execution=ExecutionEnum.DIRECT
+            )
+        )
+
+    active, latency, server_status = await checker.online_service(
+        service=service("http://web/health", "200", "==", "status_code")
+    )
+    assert active and latency is not None and server_status
+    assert not (await checker.online_service(
+        service=service("http://web/health", "down", "in", "content")
+    ))[0]
+    assert await checker.online_service(
+        service=service("http://web/down", "200", "==", "status_code")
+    ) == (False, None, True)
+    # content beyond cap is never looked at
+    assert not (await checker.online_service(
+        service=service("http://web/big", "up", "in", "content")
+    ))[0]
+    assert len(requests) == 4
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_drain_body():
+    """
+    test small bodies are drained so connection can be reused, big ones are cut
+    """
+    def handler(request: httpx.Request):
+        size = 10 if request.url.path == "/small" else 100
+        return httpx.Response(200, content=b"x" * size)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        async with client.stream("GET", "http://web/small") as response:
+            assert await checker.drain_body(response=response, max_bytes=50)
+        async with client.stream("GET", "http://web/big") as response:
+            assert not await checker.drain_body(response=response, max_bytes=50)
+
+
+@pytest.mark.asyncio
+async def test_online_service_coalescing(monkeypatch):
+    """
+    test identical online checks due together share one probe with their own predicates
+    """
+    probes = []
+    release = asyncio.Event()
+
+    async def probe(service: Service):
+        probes.append(service.id_service)
+        await release.wait()
+        return ("200", 0.1, True)
+
+    monkeypatch.setattr(checker, "online_probe", probe)
+    monkeypatch.setattr(checker, "online_flights", SingleFlight(name="online_checks", window=2))
+
+    def service(id_service: int, desired: str, target: str = "status_code", url: str = "http://web/health"):
+        return Service(
+            id_service=id_service,
+            id_server=1,
+            service_name=f"web{id_service}",
+            service_type=ServiceTypeEnum.ONLINE,
+            config=Config(
+                id_service=id_service,
+                url=url,
+                method=MethodEnum.GET,
+                desired_response=desired,
+                operator=OnlineOperatorEnaum.EQ,
+                target=TargetEnaum(target),
+                execution=ExecutionEnum.SSH
+            )
+        )
+
+    assert checker.online_probe_key(service(1, "200")) == checker.online_probe_key(service(2, "500"))
+    assert checker.online_probe_key(service(1, "a", "content")) != checker.online_probe_key(service(2, "b", "content"))
+    assert checker.online_phase_key(service(1, "200")) == checker.online_phase_key(service(2, "500"))
+
+    checks = [
+        asyncio.create_task(checker.online_service(service=service(1, "200"))),
+        asyncio.create_task(checker.online_service(service=service(2, "500"))),
+        asyncio.create_task(checker.online_service(service=service(3, "200", url="http://web/other")))
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*checks)
+    assert probes == [1, 3]
+    assert results == [(True, 0.1, True), (False, None, True), (True, 0.1, True)]
+
+    # a check due right after reuses the result, a later one probes again
+    assert (await checker.online_service(service=service(4, "200")))[0]
+    assert probes == [1, 3]
+    checker.online_flights.results = {
+        slot: (at - 3, result) for slot, (at, result) in checker.online_flights.results.items()
+    }
+    await checker.online_service(service=service(4, "200"))
+    assert probes == [1, 3, 4]
@@ -0,0 +1,487 @@
+"""
+Testing websocket and ssh connection managers
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import paramiko
+import pytest
+
+from app.core import metrics
+from app.models import Server
+from app.src import connection_manager
+from app.src.connection_manager import (ServiceConnectionManager, SSHManager,
+                                        WebSocketClient, encode, reconnect_delay)
+from app.src.probe import END_MARK, CpuTimes
+from app.src.ssh_pool import SSHPool
+
+
+class FakeWebSocket:
+    """
+    websocket which blocks on send until released
+    """
+    def __init__(self):
+        self.sent: list[str] = []
+        self.release = asyncio.Event()
+        self.closed = False
+
+    async def send_text(self, data: str):
+        await self.release.wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str | None = None):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_websocket_client_coalesces_messages():
+    """
+    test queued messages with the same key are replaced by newer ones
+    """
+    websocket = FakeWebSocket()
+    client = WebSocketClient(websocket=websocket, on_evict=lambda ws: None) # type: ignore
+    client.send(payload="first")
+    await asyncio.sleep(0)
+    for i in range(5):
+        client.send(payload=f"service-1-{i}", key=1)
+    client.send(payload="service-2", key=2)
+    await asyncio.sleep(0.01)
+    websocket.release.set()
+    await asyncio.sleep(0.01)
+    assert websocket.sent == ["first", "service-1-4", "service-2"]
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_websocket_client_evicts_on_overflow(monkeypatch):
+    """
+    test a websocket which does not keep up is evicted
+    """
+    monkeypatch.setattr(connection_manager, "WS_SEND_QUEUE_SIZE", 2)
+    evicted = []
+    before = metrics.snapshot().get("ws_evicted_overflow", 0)
+    websocket = FakeWebSocket()
+    client = WebSocketClient(websocket=websocket, on_evict=evicted.append) # type: ignore
+    for i in range(4):
+        client.send(payload=str(i))
+    await asyncio.sleep(0.01)
+    assert evicted == [websocket]
+    assert websocket.closed
+    assert client.closed
+    assert metrics.snapshot()["ws_evicted_overflow"] == before + 1
+
+
+class RecordingClient:
+    """
+    websocket client which records queued payloads
+    """
+    def __init__(self):
+        self.sent: list[tuple[str, object]] = []
+
+    def send(self, payload: str, key=None):
+        self.sent.append((payload, key))
+
+
+@pytest.mark.asyncio
+async def test_broadcast_encodes_once(monkeypatch):
+    """
+    test a message is encoded once and the same text is queued for every subscriber
+    """
+    ServiceConnectionManager.__init__()
+    encoded = []
+
+    def counting_encode(message):
+        encoded.append(message)
+        return encode(message)
+
+    monkeypatch.setattr(connection_manager, "encode", counting_encode)
+    clients = {}
+    for channel, count in ((0, 2), (1, 1), (-1, 2)):
+        for i in range(count):
+            websocket = f"ws{channel}/{i}"
+            clients[websocket] = RecordingClient()
+            ServiceConnectionManager.active_connections.setdefault(channel, []).append(websocket) # type: ignore
+    ServiceConnectionManager.clients = clients # type: ignore
+
+    message = {"type": "beat", "seq": 1, "data": {1: [{"Active": True}]}}
+    await ServiceConnectionManager.broadcast_many(message=message, channels=[1, -1, 0])
+    assert len(encoded) == 1
+    payloads = {sent[0] for client in clients.values() for sent in client.sent}
+    assert payloads == {'{"type":"beat","seq":1,"data":{"1":[{"Active":true}]}}'}
+    assert all(len(client.sent) == 1 for client in clients.values())
+
+    await ServiceConnectionManager.broadcast(message=message, channel=2)
+    assert len(encoded) == 1
+
+
+class DeadSSHClient:
+    """
+    ssh client whose transport is gone
+    """
+    def get_transport(self):
+        return None
+
+    def close(self):
+        pass
+
+
+def test_reconnect_delay_backs_off_with_jitter(monkeypatch):
+    """
+    test reconnect delay doubles per failure within jitter bounds and is capped
+    """
+    monkeypatch.setattr(connection_manager, "SSH_RECONNECT_BASE", 1)
+    monkeypatch.setattr(connection_manager, "SSH_RECONNECT_MAX", 60)
+    for failures in range(10):
+        delay = min(60, 2 ** failures)
+        assert delay / 2 <= reconnect_delay(failures=failures) <= delay
+
+
+@pytest.mark.asyncio
+async def test_dead_ssh_client_short_circuits():
+    """
+    test checks against a dead connection fail fast and leave reconnecting to supervisor
+    """
+    SSHManager.__init__()
+    ssh = DeadSSHClient()
+    SSHManager.active_connections[7] = ssh # type: ignore
+    assert not await SSHManager.is_active(ssh=ssh) # type: ignore
+    with pytest.raises(ConnectionError):
+        await SSHManager.exec_command(ssh=ssh, command="true") # type: ignore
+    assert await SSHManager.get_ssh_client(server=None, id_server=7) is ssh
+
+    SSHManager.active_connections.pop(7)
+    SSHManager.schedule_reconnect(id_server=7)
+    assert await SSHManager.get_ssh_client(server=None, id_server=7) is None
+
+
+@pytest.mark.asyncio
+async def test_disconnect_forgets_cpu_sample():
+    """
+    test disconnecting a server drops its previous cpu sample
+    """
+    SSHManager.__init__()
+    ssh = DeadSSHClient()
+    SSHManager.active_connections[7] = ssh # type: ignore
+    SSHManager.probe.cpu_samples[7] = CpuTimes(total=1000, idle=800)
+    SSHManager.probe.cpu_samples[8] = CpuTimes(total=1000, idle=800)
+    await SSHManager.disconnect(channel=7)
+    assert 7 not in SSHManager.probe.cpu_samples
+    assert 8 in SSHManager.probe.cpu_samples
+    assert 7 not in SSHManager.active_connections
+
+
+@pytest.mark.asyncio
+async def test_blocking_ssh_calls_run_off_event_loop(monkeypatch):
+    """
+    test slow ssh commands of many servers overlap without stalling event loop
+    """
+    SSHManager.__init__()
+
+    def read_blocking(ssh, command, timeout):
+        time.sleep(0.3)
+        return command
+
+    monkeypatch.setattr(SSHManager, "_SSHManager__read_blocking", staticmethod(read_blocking))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    started = time.monotonic()
+    outputs = await asyncio.gather(*[
+        SSHManager.exec_command(ssh=FakeSSHClient(), command=str(i)) # type: ignore
+        for i in range(4)
+    ])
+    elapsed = time.monotonic() - started
+    ticking.cancel()
+    assert outputs == ["0", "1", "2", "3"]
+    assert elapsed < 0.6
+    assert ticks >= 10
+
+    with pytest.raises(TimeoutError):
+        await SSHManager.run_blocking(lambda: time.sleep(0.3), timeout=0.05)
+
+
+class FakeTransport:
+    """
+    transport which is always active
+    """
+    def is_active(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class FakeSSHClient:
+    """
+    ssh client with an active transport
+    """
+    def get_transport(self):
+        return FakeTransport()
+
+    def close(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_busy_server_does_not_starve_executor(monkeypatch):
+    """
+    test commands waiting for a channel of a busy server do not hold executor threads
+    """
+    SSHManager.__init__()
+    monkeypatch.setattr(SSHManager, "executor", ThreadPoolExecutor(max_workers=2))
+    busy, other = FakeSSHClient(), FakeSSHClient()
+    SSHManager.pools[busy] = SSHPool( # type: ignore
+        id_server=1,
+        primary=busy, # type: ignore
+        connect=FakeSSHClient, # type: ignore
+        min_transports=1,
+        max_transports=1,
+        max_channels=1
+    )
+    release = threading.Event()
+
+    def read_blocking(ssh, command, timeout):
+        if ssh is busy:
+            release.wait(5)
+        return command
+
+    monkeypatch.setattr(SSHManager, "_SSHManager__read_blocking", staticmethod(read_blocking))
+    waiting = [
+        asyncio.create_task(SSHManager.exec_command(ssh=busy, command=str(i))) # type: ignore
+        for i in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    assert await asyncio.wait_for(
+        SSHManager.exec_command(ssh=other, command="other"), # type: ignore
+        timeout=1
+    ) == "other"
+    release.set()
+    assert await asyncio.gather(*waiting) == ["0", "1", "2"]
+    SSHManager.executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_health_probe_of_busy_server(monkeypatch):
+    """
+    test health probe of a server whose channels are all busy does not reconnect it
+    """
+    SSHManager.__init__()
+    busy = FakeSSHClient()
+    SSHManager.pools[busy] = SSHPool( # type: ignore
+        id_server=1,
+        primary=busy, # type: ignore
+        connect=FakeSSHClient, # type: ignore
+        min_transports=1,
+        max_transports=1,
+        max_channels=1
+    )
+    release = threading.Event()
+    refuse = False
+
+    def read_blocking(ssh, command, timeout):
+        if command == "true" and refuse:
+            raise paramiko.ssh_exception.ChannelException(1, "open failed")
+        if command != "true":
+            release.wait(5)
+        return ""
+
+    monkeypatch.setattr(SSHManager, "_SSHManager__read_blocking", staticmethod(read_blocking))
+    monkeypatch.setattr(connection_manager, "SSH_POOL_WAIT_TIMEOUT", 0.05)
+    running = asyncio.create_task(SSHManager.exec_command(ssh=busy, command="sleep")) # type: ignore
+    await asyncio.sleep(0.05)
+    with pytest.raises(TimeoutError):
+        await SSHManager.exec_command(ssh=busy, command="queued") # type: ignore
+
+    await SSHManager._SSHManager__probe_health(id_server=1, ssh=busy) # type: ignore
+    refuse = True
+    await SSHManager._SSHManager__probe_health(id_server=1, ssh=busy) # type: ignore
+    assert 1 not in SSHManager.reconnecting
+    release.set()
+    await running
+
+
+@pytest.mark.asyncio
+async def test_check_during_reconnect_does_not_wait(monkeypatch):
+    """
+    test a server stays reconnecting during supervisor's attempt, so checks get None at once
+    """
+    SSHManager.__init__()
+    connecting = threading.Event()
+
+    def connect_blocking(ssh, server):
+        connecting.set()
+        time.sleep(0.5)
+        ssh._transport = FakeTransport()
+
+    server = Server(id_server=5, name="s", ip="127.0.0.1", port=22, username="root", password="x")
+
+    class FakeSession:
+        def get(self, model, id_server):
+            return server
+
+    monkeypatch.setattr(connection_manager, "get_db", lambda: iter([FakeSession()]))
+    monkeypatch.setattr(SSHManager, "_SSHManager__connect_blocking", staticmethod(connect_blocking))
+    SSHManager.active_connections[5] = DeadSSHClient() # type: ignore
+    SSHManager.schedule_reconnect(id_server=5)
+    reconnect = asyncio.create_task(SSHManager._SSHManager__reconnect(id_server=5)) # type: ignore
+    await asyncio.to_thread(connecting.wait, 1)
+
+    assert 5 in SSHManager.reconnecting
+    started = time.monotonic()
+    assert await SSHManager.get_ssh_client(server=server, id_server=None) is None
+    assert time.monotonic() - started < 0.1
+    await reconnect
+    assert 5 not in SSHManager.reconnecting
+    assert await SSHManager.get_ssh_client(server=server, id_server=None) is not None
+
+
+class FakeChannel:
+    """
+    channel of a metrics stream which sends queued chunks
+    """
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+        self.closed = False
+
+    def recv_ready(self):
+        return bool(self.chunks)
+
+    def recv(self, size):
+        return self.chunks.pop(0)
+
+    def exit_status_ready(self):
+        return False
+
+    def exec_command(self, command):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_metrics_stream_runs_on_event_loop(monkeypatch):
+    """
+    test metrics stream is read by a task without a thread and holds a pool channel slot
+    """
+    SSHManager.__init__()
+    monkeypatch.setattr(connection_manager, "SERVER_METRICS_INTERVAL", 0.05)
+    channel = FakeChannel([b"cpu 1\n" + END_MARK.encode() + b"\ncpu", b" 2\n" + END_MARK.encode() + b"\n"])
+
+    class StreamTransport(FakeTransport):
+        def open_session(self, timeout=None):
+            return channel
+
+    class StreamClient(FakeSSHClient):
+        def get_transport(self):
+            return StreamTransport()
+
+    ssh = StreamClient()
+    pool = SSHPool(
+        id_server=1,
+        primary=ssh, # type: ignore
+        connect=StreamClient, # type: ignore
+        min_transports=1,
+        max_transports=1,
+        max_channels=2
+    )
+    SSHManager.pools[ssh] = pool # type: ignore
+    SSHManager.active_connections[1] = ssh # type: ignore
+    monkeypatch.setattr(SSHManager.probe, "status", lambda id_server, output: {"output": output})
+    SSHManager.start_metrics_stream(id_server=1)
+    assert isinstance(SSHManager.streams[1], asyncio.Task)
+    for _ in range(50):
+        await asyncio.sleep(0.02)
+        if SSHManager.streamed_status.get(1, (0, {}))[1].get("output") == "cpu 2\n":
+            break
+    assert SSHManager.get_streamed_status(id_server=1) == ({"output": "cpu 2\n"}, False)
+    assert pool.in_use[ssh] == 1 # type: ignore
+
+    task = SSHManager.streams[1]
+    SSHManager.stop_metrics_stream(id_server=1)
+    await asyncio.wait_for(task, timeout=1)
+    assert channel.closed and pool.in_use[ssh] == 0 # type: ignore
+
+
+def test_ssh_connect_single_flight(monkeypatch):
+    """
+    test concurrent callers from many threads and loops share one in-flight connect
+    """
+    SSHManager.__init__()
+    calls = []
+
+    def connect_blocking(ssh, server):
+        calls.append(server.id_server)
+        time.sleep(0.2)
+        ssh._transport = FakeTransport()
+
+    monkeypatch.setattr(SSHManager, "_SSHManager__connect_blocking", staticmethod(connect_blocking))
+    server = Server(id_server=3, name="s", ip="127.0.0.1", port=22, username="root", password="x")
+    clients = []
+
+    def caller():
+        clients.append(asyncio.run(SSHManager.get_ssh_client(server=server, id_server=None)))
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert calls == [3]
+    assert len(clients) == 8 and all(c is clients[0] for c in clients)
+    assert SSHManager.active_connections == {3: clients[0]}
+    asyncio.run(SSHManager.disconnect(channel=3))
+    assert not SSHManager.active_connections and not SSHManager.pools
+
+
+def test_ssh_failed_connect_is_not_registered(monkeypatch):
+    """
+    test a client is registered only after connect succeeded
+    """
+    SSHManager.__init__()
+
+    def connect_blocking(ssh, server):
+        raise OSError("unreachable")
+
+    monkeypatch.setattr(SSHManager, "_SSHManager__connect_blocking", staticmethod(connect_blocking))
+    server = Server(id_server=4, name="s", ip="127.0.0.1", port=22, username="root", password="x")
+    assert asyncio.run(SSHManager.get_ssh_client(server=server, id_server=None)) is None
+    assert 4 not in SSHManager.active_connections
+    assert 4 in SSHManager.reconnecting
+
+
+def test_ssh_warm_up_progress(monkeypatch):
+    """
+    test warm-up connects all servers and reports progress
+    """
+    SSHManager.__init__()
+    servers = {
+        i: Server(id_server=i, name=f"s{i}", ip="127.0.0.1", port=22, username="root", password="x")
+        for i in range(1, 6)
+    }
+
+    class FakeSession:
+        def get(self, model, id_server):
+            return servers.get(id_server)
+
+    def connect_blocking(ssh, server):
+        if server.id_server == 5:
+            raise OSError("unreachable")
+        ssh._transport = FakeTransport()
+
+    monkeypatch.setattr(connection_manager, "get_db", lambda: iter([FakeSession()]))
+    monkeypatch.setattr(SSHManager, "_SSHManager__connect_blocking", staticmethod(connect_blocking))
+    asyncio.run(SSHManager.warm_up(id_servers=list(servers)))
+    warmup = SSHManager.warmup
+    assert warmup["ready"] and warmup["total"] == 5
+    assert (warmup["connected"], warmup["failed"]) == (4, 1)
+    assert warmup["seconds_to_ready"] is not None
+    assert sorted(SSHManager.active_connections) == [1, 2, 3, 4]
@@ -0,0 +1,85 @@
+"""
+Testing server resource probe parser
+"""
+from app.src.probe import (END_MARK, CpuTimes, ServerProbe, cpu_usage, parse_cpu,
+                           parse_df, parse_meminfo, parse_sections, stream_command)
+
+OUTPUT = """### stat
+cpu  1000 0 500 8000 500 0 0 0 0 0
+### meminfo
+MemTotal:        8000000 kB
+MemFree:         1000000 kB
+MemAvailable:    3000000 kB
+Buffers:          200000 kB
+Cached:          1500000 kB
+### df
+Filesystem     1024-blocks      Used Available Capacity Mounted on
+/dev/sda1        100000000  40000000  60000000      40% /
+tmpfs              4000000         0   4000000       0% /dev/shm
+/dev/sda1        100000000  40000000  60000000      40% /var/lib/docker
+/dev/nvme0n1p2    50000000  10000000  40000000      20% /home
+/dev/loop0           60000     60000         0     100% /snap/core/1
+"""
+
+
+def test_parse_sections():
+    """
+    test probe output is split into sections
+    """
+    sections = parse_sections(OUTPUT)
+    assert sorted(sections.keys()) == ["df", "meminfo", "stat"]
+    assert len(sections["meminfo"]) == 5
+
+
+def test_parse_cpu_meminfo_df():
+    """
+    test parsing of each probe section
+    """
+    sections = parse_sections(OUTPUT)
+    assert parse_cpu(sections["stat"]) == CpuTimes(total=10000, idle=8500)
+    assert parse_meminfo(sections["meminfo"]) == (8000000, 5000000)
+    assert parse_meminfo(["MemTotal: 100 kB", "MemFree: 10 kB", "Cached: 20 kB"]) == (100, 70)
+    assert parse_df(sections["df"]) == (150000000, 50000000)
+
+
+def test_cpu_usage_from_deltas():
+    """
+    test cpu usage is computed between consecutive samples
+    """
+    assert cpu_usage(previous=None, current=CpuTimes(total=10000, idle=8500)) == 15.0
+    assert cpu_usage(
+        previous=CpuTimes(total=10000, idle=8500),
+        current=CpuTimes(total=10400, idle=8600)
+    ) == 75.0
+    assert cpu_usage(
+        previous=CpuTimes(total=10000, idle=8500),
+        current=CpuTimes(total=10000, idle=8500)
+    ) == 15.0
+
+
+def test_server_probe_status():
+    """
+    test server probe keeps previous cpu sample per server
+    """
+    probe = ServerProbe()
+    status = probe.status(id_server=1, output=OUTPUT)
+    assert status == {
+        "cpu_usage_percentage": 15.0,
+        "total_memory_in_KB": 8000000,
+        "used_memory_in_KB": 5000000,
+        "total_disk_in_KB": 150000000,
+        "used_disk_in_KB": 50000000
+    }
+    second = OUTPUT.replace("cpu  1000 0 500 8000 500", "cpu  1200 0 600 8050 550")
+    assert probe.status(id_server=1, output=second)["cpu_usage_percentage"] == 75.0
+    assert probe.status(id_server=2, output=second)["cpu_usage_percentage"] == 17.31
+
+
+def test_stream_command():
+    """
+    test sampler loop prints probe output and end mark on each interval
+    """
+    command = stream_command(interval=1.5)
+    assert command.startswith("while :; do ")
+    assert f"echo '{END_MARK}'; sleep 1.5; done" in command
+    assert parse_sections(OUTPUT + END_MARK + "\n")["end"] == []
@@ -0,0 +1,230 @@
+"""
+Testing beat scheduler
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.models import ServiceTypeEnum
+from app.src import connection_manager, task
+from app.src.task import BeatScheduler
+
+
+@pytest.fixture(name="scheduler")
+def scheduler_fixture():
+    """
+    fresh beat scheduler for testing
+    """
+    BeatScheduler.__init__()
+    yield BeatScheduler()
+    BeatScheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_scheduler_dispatch_and_reschedule(scheduler, monkeypatch):
+    """
+    test scheduler checks due services and keeps them on heap
+    """
+    checked = []
+
+    async def fake_beater(id_service: int):
+        checked.append(id_service)
+        return 10.0
+
+    monkeypatch.setattr(task, "run_beater", fake_beater)
+    scheduler.schedule(id_service=1)
+    scheduler.schedule(id_service=2)
+    scheduler.schedule(id_service=3, delay=60)
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.1)
+    scheduler.stop()
+    await runner
+
+    assert sorted(checked) == [1, 2]
+    assert sorted(i[2] for i in scheduler.queue) == [1, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_unschedule(scheduler, monkeypatch):
+    """
+    test unscheduled and missing services are dropped from scheduler
+    """
+    checked = []
+
+    async def fake_beater(id_service: int):
+        checked.append(id_service)
+        return None
+
+    monkeypatch.setattr(task, "run_beater", fake_beater)
+    scheduler.schedule(id_service=1)
+    scheduler.schedule(id_service=2)
+    scheduler.unschedule(id_service=1)
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.1)
+    scheduler.stop()
+    await runner
+
+    assert checked == [2]
+    assert scheduler.tokens == {}
+
+
+def test_scheduler_phase_offsets(scheduler):
+    """
+    test services tick on stable phases within interval, shared by systemd services of a server
+    and by online services with identical probes
+    """
+    for i in range(1, 5):
+        scheduler.schedule(id_service=i, interval=60)
+    scheduler.schedule(id_service=5, interval=60, service_type=ServiceTypeEnum.SYSTEMD, id_server=1)
+    scheduler.schedule(id_service=6, interval=60, service_type=ServiceTypeEnum.SYSTEMD, id_server=1)
+    scheduler.schedule(id_service=7, interval=60, phase_key="probe-1|GET|http://web")
+    scheduler.schedule(id_service=8, interval=60, phase_key="probe-1|GET|http://web")
+    due = {i[2]: i[0] for i in scheduler.queue}
+    phases = {i: round(d % 60, 6) for i, d in due.items()}
+    assert len({phases[i] for i in range(1, 5)}) == 4
+    assert phases[5] == phases[6]
+    assert phases[7] == phases[8]
+    # a service whose probe is not shared anymore gets its own phase again
+    scheduler.schedule(id_service=8, interval=60, service_type=ServiceTypeEnum.ONLINE, id_server=1)
+    assert 8 not in scheduler.phase_keys
+    scheduler.schedule(id_service=7, interval=60, phase_key="probe-1|GET|http://web")
+    assert scheduler.phase_keys[7] == "probe-1|GET|http://web"
+    assert all(0 < d - time.monotonic() <= 60 for d in due.values())
+
+    # phase is kept when a service is scheduled again
+    scheduler.schedule(id_service=1)
+    assert round(max(i[0] for i in scheduler.queue if i[2] == 1) % 60, 6) == phases[1]
+
+
+def test_scheduler_overrun_policies(scheduler):
+    """
+    test a check which overran its next ticks is rescheduled based on overrun policy
+    """
+    reschedule = scheduler._BeatScheduler__reschedule
+
+    def overrun(policy: str) -> float:
+        scheduler.overrun_policy = policy
+        scheduler.schedule(id_service=1, delay=0)
+        token = scheduler.tokens[1]
+        # check was due 35 seconds ago with a 10 seconds interval
+        reschedule(id_service=1, token=token, due=time.monotonic() - 35, interval=10)
+        return max(i[0] for i in scheduler.queue if i[1] == token) - time.monotonic()
+
+    assert 0 < overrun("skip") <= 10
+    assert overrun("immediate") <= 0
+    scheduler.overruns.clear()
+    assert 10 < overrun("backoff") <= 20
+    assert 30 < overrun("backoff") <= 40
+    assert scheduler.overruns[1] == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_hold_and_release(scheduler, monkeypatch):
+    """
+    test held scheduler dispatches nothing and keeps spread of due times on release
+    """
+    checked = []
+
+    async def fake_beater(id_service: int):
+        checked.append(id_service)
+        return 10.0
+
+    monkeypatch.setattr(task, "run_beater", fake_beater)
+    scheduler.hold()
+    scheduler.schedule(id_service=1)
+    scheduler.schedule(id_service=2, delay=60)
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.2)
+    assert checked == []
+    due = {i[2]: i[0] for i in scheduler.queue}
+
+    scheduler.release()
+    await asyncio.sleep(0.1)
+    scheduler.stop()
+    await runner
+    assert checked == [1]
+    later = {i[2]: i[0] for i in scheduler.queue}
+    assert later[2] - due[2] >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_batches_systemd_services(scheduler, monkeypatch):
+    """
+    test systemd services of the same server are checked in one job
+    """
+    single, batched = [], []
+
+    async def fake_beater(id_service: int):
+        single.append(id_service)
+        return 10.0
+
+    async def fake_systemd_beaters(id_services: list[int]):
+        batched.append(sorted(id_services))
+        return {i: 10.0 for i in id_services}
+
+    monkeypatch.setattr(task, "run_beater", fake_beater)
+    monkeypatch.setattr(task, "run_systemd_beaters", fake_systemd_beaters)
+    scheduler.schedule(id_service=1, service_type=ServiceTypeEnum.SYSTEMD, id_server=1)
+    scheduler.schedule(id_service=2, service_type=ServiceTypeEnum.SYSTEMD, id_server=1)
+    scheduler.schedule(
+        id_service=3,
+        delay=task.SYSTEMD_BATCH_WINDOW / 2,
+        service_type=ServiceTypeEnum.SYSTEMD,
+        id_server=1
+    )
+    scheduler.schedule(id_service=4, service_type=ServiceTypeEnum.SYSTEMD, id_server=2)
+    scheduler.schedule(id_service=5, service_type=ServiceTypeEnum.ONLINE, id_server=1)
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.1)
+    scheduler.stop()
+    await runner
+
+    assert sorted(batched) == [[1, 2, 3]]
+    assert sorted(single) == [4, 5]
+
+
+@pytest.mark.asyncio
+async def test_collect_server_load_reports_stale(monkeypatch):
+    """
+    test server load collection of slow hosts overlaps and reports them as stale,
+    and a host whose probe is still running is not probed again
+    """
+    probes = []
+
+    async def is_active(ssh, retry=1):
+        return True
+
+    async def get_server_status(ssh, retry=1, id_server=None):
+        probes.append(id_server)
+        await asyncio.sleep(ssh)
+        return {"cpu_usage_percentage": float(id_server)}
+
+    monkeypatch.setattr(connection_manager.SSHManager, "is_active", is_active)
+    monkeypatch.setattr(connection_manager.SSHManager, "get_server_status", get_server_status)
+    monkeypatch.setattr(task, "SERVER_LOAD_TIMEOUT", 0.2)
+    semaphore = asyncio.Semaphore(10)
+    last_load = {2: {"active": True, "status": {"cpu_usage_percentage": 1.0}}}
+    in_flight: dict[int, asyncio.Task] = {}
+
+    started = asyncio.get_running_loop().time()
+    fast, slow = await asyncio.gather(
+        task.collect_server_load(
+            id_server=1, ssh=0.1, semaphore=semaphore, last_load=last_load, in_flight=in_flight
+        ),
+        task.collect_server_load(
+            id_server=2, ssh=5, semaphore=semaphore, last_load=last_load, in_flight=in_flight
+        ),
+    )
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert fast == {"active": True, "status": {"cpu_usage_percentage": 1.0}, "stale": False}
+    assert slow == {"active": True, "status": {"cpu_usage_percentage": 1.0}, "stale": True}
+    assert last_load[1] == fast
+    assert list(in_flight) == [2]
+
+    # hung host is skipped while its probe is running
+    again = await task.collect_server_load(
+        id_server=2, ssh=5, semaphore=semaphore, last_load=last_load, in_flight=in_flight
+    )
+    assert again["stale"] and probes == [1, 2]
+    in_flight[2].cancel()
@@ -2,15 +2,17 @@
 Testing Server APIs
 """
 import os
+import time
 
 import pytest
 from dotenv import load_dotenv
 from fastapi.testclient import TestClient
-from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel import Session, SQLModel, create_engine, select
 from sqlmodel.pool import StaticPool
 
 from app.api.deps import get_db
 from app.main import app
+from app.models import ServerMetric
 from app.models.server import Server
 
 load_dotenv('.env_test')
@@ -187,12 +189,15 @@ async def test_delete_server(session: Session, client: TestClient):
     )
     session.add(server)
     session.commit()
+    session.add(ServerMetric(id_server=server.id_server, resolution=0, timestamp=1.0)) # type: ignore
+    session.commit()
 
     response = client.delete(f"api/server/{server.id_server}")
     data = response.json()
     assert response.status_code == 202
     assert data["ok"] is True
     assert session.get(Server, server.id_server) is None
+    assert not session.exec(select(ServerMetric)).all()
 
 
 @pytest.mark.asyncio
@@ -203,3 +208,45 @@ async def test_delete_server_invalid(client: TestClient):
 
     response = client.delete("api/server/2")
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_server_metrics(session: Session, client: TestClient):
+    """
+    test server metrics API picks resolution from requested range
+    """
+    server = Server(
+        name="local_server",
+        ip="localhost",
+        port=22,
+        username=USERNAME,
+        password=PASSWORD
+    )
+    session.add(server)
+    session.commit()
+    now = time.time()
+    for resolution in (0, 60, 3600):
+        session.add(ServerMetric(
+            id_server=server.id_server, # type: ignore
+            resolution=resolution,
+            timestamp=now - 1800,
+            cpu_usage_percentage=float(resolution)
+        ))
+    session.commit()
+
+    assert client.get("api/server/99/metrics").status_code == 404
+    response = client.get(f"api/server/{server.id_server}/metrics?start={now}&end={now - 10}")
+    assert response.status_code == 400
+
+    expected = ((3600, 0), (12 * 3600, 60), (300 * 86400, 3600))
+    for span, resolution in expected:
+        response = client.get(
+            f"api/server/{server.id_server}/metrics?start={now - span}&end={now}"
+        )
+        data = response.json()
+        assert response.status_code == 200
+        assert data["resolution"] == resolution
+        assert [m["cpu_usage_percentage"] for m in data["data"]] == [float(resolution)]
+
+    # default range is the last hour of raw samples
+    assert client.get(f"api/server/{server.id_server}/metrics").json()["resolution"] == 0
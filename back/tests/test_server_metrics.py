@@ -0,0 +1,81 @@
+"""
+Testing server metrics history
+"""
+import time
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from app.models import Server, ServerMetric
+from app.src import server_metrics
+from app.src.server_metrics import ServerMetricStore, pick_resolution
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(monkeypatch):
+    """
+    in memory db engine used by server metric store
+    """
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Server(id_server=1, name="s", ip="127.0.0.1", port=22, username="root"))
+        session.commit()
+
+    def get_db_override():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(server_metrics, "get_db", get_db_override)
+    ServerMetricStore.__init__()
+    yield engine
+
+
+def test_pick_resolution():
+    """
+    test finest tier holding the range is picked
+    """
+    now = 1_000_000_000.0
+    assert pick_resolution(start=now - 3600, end=now, now=now) == 0
+    assert pick_resolution(start=now - 12 * 3600, end=now, now=now) == 60
+    assert pick_resolution(start=now - 300 * 86400, end=now, now=now) == 3600
+
+
+@pytest.mark.asyncio
+async def test_server_metrics_rollup(engine, monkeypatch):
+    """
+    test raw samples are rolled up into minute buckets once and expired by retention
+    """
+    monkeypatch.setattr(server_metrics, "SERVER_METRICS_RAW_INTERVAL", 10)
+    store = ServerMetricStore()
+    start = time.time() // 60 * 60 - 600
+    for i in range(12):
+        store.add(
+            id_server=1,
+            status={"cpu_usage_percentage": float(i), "used_memory_in_KB": 100},
+            timestamp=start + i * 10
+        )
+    # not due yet
+    store.add(id_server=1, status={"cpu_usage_percentage": 99.0}, timestamp=start + 115)
+    assert len(store.buffer) == 12
+    await store.flush()
+
+    store.maintain(now=start + 130)
+    store.maintain(now=start + 130)
+    with Session(engine) as session:
+        minutes = session.exec(
+            select(ServerMetric).where(ServerMetric.resolution == 60).order_by(ServerMetric.timestamp)
+        ).all()
+    assert [m.timestamp for m in minutes] == [start, start + 60]
+    assert minutes[0].cpu_usage_percentage == pytest.approx(2.5)
+    assert minutes[0].max_cpu_usage_percentage == 5.0
+    assert minutes[1].used_memory_in_KB == 100
+
+    # raw samples expire, minute buckets are kept and rolled up into an hour bucket
+    store.maintain(now=start + 2 * 86400)
+    with Session(engine) as session:
+        resolutions = sorted(m.resolution for m in session.exec(select(ServerMetric)).all())
+    assert resolutions == [60, 60, 3600]
@@ -11,7 +11,9 @@ from sqlmodel.pool import StaticPool
 
 from app.api.deps import get_db
 from app.main import app
-from app.models import Config, Server, Service, ServiceTypeEnum
+from app.models import Config, JournalCursor, Server, Service, ServiceTypeEnum
+from app.src import connection_manager, task
+from app.src.task import LiveBoard
 
 load_dotenv('.env_test')
 
@@ -366,6 +368,7 @@ async def test_delete_server(session: Session, client: TestClient):
     session.add(server)
     session.add(service)
     session.add(config)
+    session.add(JournalCursor(id_service=1, cursor="s=abc", matched=True, timestamp=1.0))
     session.commit()
 
     response = client.delete(f"/api/service/{service.id_service}")
@@ -375,6 +378,8 @@ async def test_delete_server(session: Session, client: TestClient):
     assert data["ok"] is True
     assert session.get(Service, service.id_service) is None
     assert session.get(Config, config.id_config) is None
+    session.expire_all()
+    assert session.get(JournalCursor, 1) is None
 
 
 @pytest.mark.asyncio
@@ -387,3 +392,116 @@ async def test_delete_service_invalid(client: TestClient):
 
     assert response.status_code == 404
     assert data["detail"] == "Service not found"
+
+
+@pytest.mark.asyncio
+async def test_service_websocket_snapshot(session: Session, client: TestClient):
+    """
+    test service websocket sends a snapshot of its channel on connect and channel change
+    """
+    server = Server(
+        name="localhost",
+        ip="127.0.0.1",
+        port=22,
+        username=USERNAME,
+        password=PASSWORD
+    )
+    service = Service(
+        id_server=1,
+        service_name="local_backend",
+        service_type=ServiceTypeEnum.SYSTEMD
+    )
+    session.add(server)
+    session.add(service)
+    session.commit()
+
+    with client.websocket_connect("/api/service/") as websocket:
+        message = websocket.receive_json()
+        assert message["type"] == "snapshot"
+        data = message["data"]
+        assert list(data.keys()) == [str(server.id_server)]
+        assert data[str(server.id_server)][0]["id_service"] == service.id_service
+        assert data[str(server.id_server)][0]["service_name"] == "local_backend"
+        assert data[str(server.id_server)][0]["beats"] == []
+
+        websocket.send_json({"id_service": service.id_service})
+        data = websocket.receive_json()["data"]
+        assert data["id_service"] == service.id_service
+        assert data["service_type"] == "SystemdServiceStatus"
+
+        websocket.send_json({"id_server": server.id_server})
+        data = websocket.receive_json()["data"]
+        assert [i["id_service"] for i in data] == [service.id_service]
+
+        # later snapshots show changes made after socket was opened
+        id_service = service.id_service
+        with Session(session.get_bind()) as other:
+            renamed = other.get(Service, id_service)
+            renamed.service_name = "renamed_backend" # type: ignore
+            other.add(renamed)
+            other.commit()
+        websocket.send_json({"id_service": id_service})
+        assert websocket.receive_json()["data"]["service_name"] == "renamed_backend"
+
+
+@pytest.mark.asyncio
+async def test_service_websocket_resume(session: Session, client: TestClient):
+    """
+    test service websocket sends only missed deltas to a resuming client
+    """
+    live_board = LiveBoard()
+    seq = live_board.seq
+    for id_service, id_server in ((1, 1), (2, 2), (3, 1)):
+        live_board.append(event={
+            "service_type": "SystemdServiceStatus",
+            "id_service": id_service,
+            "service_name": f"service{id_service}",
+            "id_server": id_server,
+            "beat": {"Active": True, "latency": None, "timestamp": 1.0, "server_status": True}
+        })
+
+    with client.websocket_connect(f"/api/service/?seq={seq + 1}") as websocket:
+        message = websocket.receive_json()
+        assert message["type"] == "beat"
+        assert message["seq"] == seq + 2
+        message = websocket.receive_json()
+        assert message["seq"] == seq + 3
+
+        websocket.send_json({"id_server": 1})
+        assert websocket.receive_json()["type"] == "snapshot"
+        websocket.send_json({"seq": seq})
+        message = websocket.receive_json()
+        assert (message["seq"], message["id_service"]) == (seq + 1, 1)
+        message = websocket.receive_json()
+        assert (message["seq"], message["id_service"]) == (seq + 3, 3)
+
+    with client.websocket_connect(f"/api/service/?seq={seq + 100}") as websocket:
+        assert websocket.receive_json()["type"] == "snapshot"
+
+
+@pytest.mark.asyncio
+async def test_service_websocket_resume_big_gap(session: Session, client: TestClient, monkeypatch):
+    """
+    test a resuming client which missed more deltas than its send queue holds gets a snapshot
+    """
+    monkeypatch.setattr(connection_manager, "WS_SEND_QUEUE_SIZE", 5)
+    monkeypatch.setattr(task, "LIVE_BOARD_MAX_RESUME", 2)
+    live_board = LiveBoard()
+    seq = live_board.seq
+    for _ in range(10):
+        live_board.append(event={
+            "service_type": "SystemdServiceStatus",
+            "id_service": 1,
+            "service_name": "service1",
+            "id_server": 1,
+            "beat": {"Active": True, "latency": None, "timestamp": 1.0, "server_status": True}
+        })
+
+    with client.websocket_connect(f"/api/service/?seq={seq}") as websocket:
+        message = websocket.receive_json()
+        assert message["type"] == "snapshot"
+        assert message["seq"] == seq + 10
+        # connection is still open
+        websocket.send_json({"seq": seq + 8})
+        assert websocket.receive_json()["seq"] == seq + 9
+        assert websocket.receive_json()["seq"] == seq + 10
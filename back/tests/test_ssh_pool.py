@@ -0,0 +1,97 @@
+"""
+Testing ssh transport pool
+"""
+import threading
+import time
+
+import pytest
+
+from app.src.ssh_pool import SSHPool
+
+
+class FakeTransport:
+    """
+    transport which is always active
+    """
+    def is_active(self):
+        return True
+
+
+class FakeClient:
+    """
+    ssh client replacement
+    """
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+
+
+def test_ssh_pool_channel_limit_and_growth():
+    """
+    test channels are limited per transport and pool grows up to max transports
+    """
+    opened = []
+
+    def connect():
+        opened.append(FakeClient())
+        return opened[-1]
+
+    primary = FakeClient()
+    pool = SSHPool(
+        id_server=1,
+        primary=primary, # type: ignore
+        connect=connect, # type: ignore
+        min_transports=1,
+        max_transports=2,
+        max_channels=2
+    )
+    clients = [pool.acquire(timeout=1) for _ in range(4)]
+    assert clients.count(primary) == 2
+    assert len(opened) == 1 and clients.count(opened[0]) == 2
+    with pytest.raises(TimeoutError):
+        pool.acquire(timeout=0.05)
+
+    pool.release(primary)
+    assert pool.acquire(timeout=1) is primary
+    pool.close()
+    assert opened[0].closed and not primary.closed
+
+
+def test_ssh_pool_fifo_waiters():
+    """
+    test waiting exec requests get a free channel in arrival order
+    """
+    primary = FakeClient()
+    pool = SSHPool(
+        id_server=1,
+        primary=primary, # type: ignore
+        connect=FakeClient, # type: ignore
+        min_transports=1,
+        max_transports=1,
+        max_channels=1
+    )
+    pool.acquire(timeout=1)
+    order = []
+
+    def waiter(i):
+        pool.acquire(timeout=5)
+        order.append(i)
+        pool.release(primary) # type: ignore
+
+    threads = []
+    for i in range(5):
+        threads.append(threading.Thread(target=waiter, args=(i,)))
+        threads[-1].start()
+        # let each waiter get in queue before the next one
+        while len(pool.waiters) < i + 1:
+            time.sleep(0.001)
+    pool.release(primary) # type: ignore
+    for t in threads:
+        t.join(timeout=5)
+    assert order == [0, 1, 2, 3, 4]
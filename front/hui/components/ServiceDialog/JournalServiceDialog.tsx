@@ -20,7 +20,7 @@ const JournalServiceDialog: React.FC<Props> = (props) => {
     const [servers, setServers] = useState<ServerListRes[]>([]);
     const [name, setName] = useState("");
     const [desiredResponse, setDesiredResponse] = useState("");
-    const [operator, setOperator] = useState< "in" | "not in">("in");
+    const [operator, setOperator] = useState< "in" | "not in" | "regex">("in");
     const [heartbeatInterval, setHeartbeatInterval] = useState<number>(1800);
     const [offset, setOffset] = useState<number>(0);
     const [limit, setLimit] = useState<number>(10);
@@ -193,6 +193,7 @@ const JournalServiceDialog: React.FC<Props> = (props) => {
                 >
                     <MenuItem key="in" value="in">in</MenuItem>
                     <MenuItem key="not in" value="not in">not in</MenuItem>
+                    <MenuItem key="regex" value="regex">regex</MenuItem>
                 </TextField>
                 <TextField
                     autoFocus
@@ -22,8 +22,9 @@ function OnlineServiceDialog(props: Props) {
     const [method, setMethod] = useState<"GET" | "POST">("GET");
     const [url, setUrl] = useState("");
     const [desiredResponse, setDesiredResponse] = useState("");
-    const [operator, setOperator] = useState<"==" | "!=" | "in" | "not in">("==");
+    const [operator, setOperator] = useState<"==" | "!=" | "in" | "not in" | "regex">("==");
     const [target, setTarget] = useState<"content" | "status_code">("status_code");
+    const [execution, setExecution] = useState<"ssh" | "direct">("ssh");
     const [data, setData] = useState("");
     const [heartbeatInterval, setHeartbeatInterval] = useState<number>(1800);
     const [offset, setOffset] = useState<number>(0);
@@ -44,6 +45,7 @@ function OnlineServiceDialog(props: Props) {
                         setDesiredResponse(response.config.desired_response ?? "");
                         setOperator(response.config.operator ?? "==");
                         setTarget(response.config.target ?? "status_code");
+                        setExecution(response.config.execution ?? "ssh");
                         setData(response.config.data ?? "");
                         setHeartbeatInterval(response.config.interval ?? 1800);
                         setSelectedServer(response.id_server ?? '');
@@ -62,6 +64,7 @@ function OnlineServiceDialog(props: Props) {
             setDesiredResponse("");
             setOperator("==");
             setTarget("status_code");
+            setExecution("ssh");
             setData("");
             setHeartbeatInterval(1800);
             setSelectedServer('');
@@ -106,6 +109,7 @@ function OnlineServiceDialog(props: Props) {
                 desired_response: desiredResponse,
                 operator: operator,
                 target: target,
+                execution: execution,
                 data: data === "" ? {} : data
             }
         };
@@ -237,6 +241,7 @@ function OnlineServiceDialog(props: Props) {
                     <MenuItem key="!=" value="!=">!=</MenuItem>
                     <MenuItem key="in" value="in">in</MenuItem>
                     <MenuItem key="not in" value="not in">not in</MenuItem>
+                    <MenuItem key="regex" value="regex">regex</MenuItem>
                 </TextField>
                 <TextField
                     id="target"
@@ -252,6 +257,20 @@ function OnlineServiceDialog(props: Props) {
                     <MenuItem key="status_code" value="status_code">status_code</MenuItem>
                     <MenuItem key="content" value="content">content</MenuItem>
                 </TextField>
+                <TextField
+                    id="execution"
+                    select
+                    label="Execution"
+                    name="execution"
+                    helperText="Run check on the server over ssh or directly from backend"
+                    value={execution}
+                    onChange={(e) => setExecution(e.target.value as "ssh" | "direct")}
+                    fullWidth
+                    variant="standard"
+                >
+                    <MenuItem key="ssh" value="ssh">ssh</MenuItem>
+                    <MenuItem key="direct" value="direct">direct</MenuItem>
+                </TextField>
                 <TextField
                     margin="dense"
                     id="data"
@@ -5,11 +5,13 @@ type Beat = {
     timestamp: number;
     Active: boolean;
     latency?: number | null; // Optional field
-    service_status: boolean;
+    server_status: boolean;
 }
 
 type ServiceData = {
+    id_service: number;
     service_name: string;
+    service_type: string;
     beats: Beat[]
 }
   
@@ -17,44 +19,94 @@ type ServiceDataSet = {
     [id_server: number]: ServiceData[];
 }
 
+type SnapshotMessage = {
+    type: "snapshot";
+    seq: number;
+    max_beats: number;
+    data: ServiceDataSet;
+}
+
+type BeatMessage = {
+    type: "beat";
+    seq: number;
+    id_server: number;
+    id_service: number;
+    service_name: string;
+    service_type: string;
+    beat: Beat;
+}
+
+const RECONNECT_DELAY_MS = 3000;
+
 
 const useWebSocket = () => {
   const [message, setMessage] = useState<ServiceDataSet>({});
 
   useEffect(() => {
     const wsEndpoint = process.env.NEXT_PUBLIC_SERVICE_WS ?? "ws://localhost:8000/api/service/";
-    const socket = new WebSocket(wsEndpoint);
+    let socket: WebSocket;
+    let lastSeq: number | null = null;
+    let maxBeats = 50;
+    let closed = false;
+    let reconnectTimer: ReturnType<typeof setTimeout>;
 
-    socket.onmessage = (event) => {
-      const newData: ServiceDataSet = JSON.parse(event.data);
-      // setMessage((prevMessage) => {
-      //   const updatedMessage = { ...prevMessage };
-      //   for (const k of Object.keys(newData)) {
-      //     if (updatedMessage[k]) {
-      //       updatedMessage[k] = [
-      //         ...updatedMessage[k],
-      //         ...newData[k].filter(
-      //           (newItem) =>
-      //             !updatedMessage[k].some(
-      //               (existingItem) => existingItem.timestamp === newItem.timestamp
-      //             )
-      //         ),
-      //       ];
-      //     } else {
-      //       updatedMessage[k] = newData[k];
-      //     }
-      //   }
-      //   for (const k of Object.keys(updatedMessage)) {
-      //     if (!Object.keys(newData).includes(k)) {
-      //       delete updatedMessage[k];
-      //     }
-      //   }
-      //   return updatedMessage;
-      // });
-      setMessage(newData);
+    const applyBeat = (prevMessage: ServiceDataSet, delta: BeatMessage) => {
+      const updatedMessage = { ...prevMessage };
+      const services = [...(updatedMessage[delta.id_server] ?? [])];
+      const i = services.findIndex((s) => s.id_service === delta.id_service);
+      const service: ServiceData = i === -1
+        ? {
+            id_service: delta.id_service,
+            service_name: delta.service_name,
+            service_type: delta.service_type,
+            beats: []
+          }
+        : services[i];
+      // a beat may already be part of the snapshot
+      if (service.beats.some((b) => b.timestamp === delta.beat.timestamp)) {
+        return prevMessage;
+      }
+      const updatedService = {
+        ...service,
+        beats: [...service.beats, delta.beat].slice(-maxBeats)
+      };
+      if (i === -1) {
+        services.push(updatedService);
+      } else {
+        services[i] = updatedService;
+      }
+      updatedMessage[delta.id_server] = services;
+      return updatedMessage;
     };
 
+    const connect = () => {
+      // resume from last received sequence number after a reconnect
+      const url = lastSeq === null ? wsEndpoint : `${wsEndpoint}?seq=${lastSeq}`;
+      socket = new WebSocket(url);
+
+      socket.onmessage = (event) => {
+        const newData: SnapshotMessage | BeatMessage = JSON.parse(event.data);
+        lastSeq = lastSeq === null ? newData.seq : Math.max(lastSeq, newData.seq);
+        if (newData.type === "snapshot") {
+          maxBeats = newData.max_beats;
+          setMessage(newData.data);
+        } else {
+          setMessage((prevMessage) => applyBeat(prevMessage, newData));
+        }
+      };
+
+      socket.onclose = () => {
+        if (!closed) {
+          reconnectTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+        }
+      };
+    };
+
+    connect();
+
     return () => {
+      closed = true;
+      clearTimeout(reconnectTimer);
       socket.close();
     };
   }, []);
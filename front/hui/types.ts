@@ -2,6 +2,7 @@
 
 export type ServerData = {
   active: boolean;
+  stale?: boolean;
   status: {
     cpu_usage_percentage: number,
     total_memory_in_KB: number,
@@ -38,8 +38,9 @@ export const addOrUpdateOnlineService = async (serviceData: {
         method: "POST" | "GET",
         url: string,
         desired_response: string,
-        operator: "==" | "!=" | "in" | "not in",
+        operator: "==" | "!=" | "in" | "not in" | "regex",
         target: "content" | "status_code",
+        execution: "ssh" | "direct",
         data: object | null
       }
 }, id_service: number|undefined) => {
@@ -66,7 +67,7 @@ export const addOrUpdateJournalService = async (serviceData: {
     config: {
         interval: number,
         desired_response: string,
-        operator: "in" | "not in"
+        operator: "in" | "not in" | "regex"
     }
 }, id_service: number|undefined) => {
     try {